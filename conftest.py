@@ -0,0 +1 @@
+# the scripts import the shared utils package from the root of the repository
@@ -0,0 +1,159 @@
+from typing import Any, Dict, Iterator, List, Tuple
+
+from multi_list import MultiListPath
+
+
+class NestedLists:
+    """
+    Nested Python lists of [value, children] pairs (children are None for a node without a branch),
+    which have the interface of MultiList used by the benchmarks
+    """
+    __slots__ = ("_items", )
+
+    def __init__(self):
+        self._items: List[list] = []
+
+    def _find(self, path: MultiListPath) -> list:
+        branch, node = self._items, None
+        for index in path:
+            if branch is None or index >= len(branch):
+                raise LookupError("Path does not exist")
+            node = branch[index]
+            branch = node[1]
+        return node
+
+    def exists(self, path: MultiListPath) -> bool:
+        try:
+            self._find(path)
+        except LookupError:
+            return False
+        return True
+
+    def find(self, path: MultiListPath):
+        return self._find(path)[0]
+
+    def change_value(self, new_value, path: MultiListPath):
+        self._find(path)[0] = new_value
+
+    def append(self, value, path: MultiListPath):
+        assert path[-1] >= 0
+        parent = self._find(path[:-1]) if len(path) > 1 else None
+        branch = self._items if parent is None else (parent[1] or [])
+        if len(branch) < path[-1]:
+            raise LookupError("Path does not exist")
+        branch.insert(path[-1], [value, None])
+        if parent is not None:
+            parent[1] = branch
+
+    def delete(self, path: MultiListPath):
+        assert path[-1] >= 0
+        parent = self._find(path[:-1]) if len(path) > 1 else None
+        branch = self._items if parent is None else parent[1]
+        if branch is None or len(branch) <= path[-1]:
+            raise LookupError("Path does not exist")
+        del branch[path[-1]]
+        if parent is not None and not branch:
+            parent[1] = None
+
+    def iterate(self, path: MultiListPath | None = None, include_all_levels: bool = True) -> Iterator[Any]:
+        branch = self._find(path)[1] if path else self._items
+        stack = [iter(branch or ())]
+        while stack:
+            for value, children in stack[-1]:
+                yield value
+                if include_all_levels and children:
+                    stack.append(iter(children))
+                    break
+            else:
+                stack.pop()
+
+    def get_items_count(self, include_all_levels: bool = True) -> int:
+        if not include_all_levels:
+            return len(self._items)
+        return sum(1 for _ in self.iterate())
+
+
+class PathDict:
+    """
+    Python dict from path tuples to values with sizes of the branches, which has the interface of MultiList
+    used by the benchmarks. Lookups are O(1), but inserting or deleting a node anywhere except the end
+    of its branch renumbers the following siblings and all their descendants
+    """
+    __slots__ = ("_values", "_sizes")
+
+    def __init__(self):
+        self._values: Dict[Tuple[int, ...], Any] = {}
+        # sizes of the branches by paths of their parents (an empty tuple for the level 0), without empty branches
+        self._sizes: Dict[Tuple[int, ...], int] = {}
+
+    def _shift(self, parent: Tuple[int, ...], position: int, delta: int):
+        depth = len(parent)
+        moved = [key for key in self._values if len(key) > depth and key[depth] >= position and key[:depth] == parent]
+        values = {key: self._values.pop(key) for key in moved}
+        sizes = {key: self._sizes.pop(key) for key in moved if key in self._sizes}
+        for source, target in ((values, self._values), (sizes, self._sizes)):
+            target.update(((*parent, key[depth] + delta, *key[depth + 1:]), value) for key, value in source.items())
+
+    def exists(self, path: MultiListPath) -> bool:
+        return tuple(path) in self._values
+
+    def find(self, path: MultiListPath):
+        try:
+            return self._values[tuple(path)]
+        except KeyError:
+            raise LookupError("Path does not exist")
+
+    def change_value(self, new_value, path: MultiListPath):
+        key = tuple(path)
+        if key not in self._values:
+            raise LookupError("Path does not exist")
+        self._values[key] = new_value
+
+    def append(self, value, path: MultiListPath):
+        assert path[-1] >= 0
+        key = tuple(path)
+        parent, position = key[:-1], key[-1]
+        size = self._sizes.get(parent, 0)
+        if (parent and parent not in self._values) or size < position:
+            raise LookupError("Path does not exist")
+        if position < size:
+            self._shift(parent, position, 1)
+        self._values[key] = value
+        self._sizes[parent] = size + 1
+
+    def delete(self, path: MultiListPath):
+        key = tuple(path)
+        if key not in self._values:
+            raise LookupError("Path does not exist")
+        if key in self._sizes:
+            for descendant in [i for i in self._values if len(i) > len(key) and i[:len(key)] == key]:
+                del self._values[descendant]
+                self._sizes.pop(descendant, None)
+            del self._sizes[key]
+        del self._values[key]
+        parent = key[:-1]
+        size = self._sizes[parent] - 1
+        if key[-1] < size:
+            self._shift(parent, key[-1] + 1, -1)
+        if size:
+            self._sizes[parent] = size
+        else:
+            del self._sizes[parent]
+
+    def iterate(self, path: MultiListPath | None = None, include_all_levels: bool = True) -> Iterator[Any]:
+        parent = tuple(path) if path else ()
+        if parent and parent not in self._values:
+            raise LookupError("Path does not exist")
+        stack = [(parent, 0)]
+        while stack:
+            parent, position = stack.pop()
+            if position >= self._sizes.get(parent, 0):
+                continue
+            key = (*parent, position)
+            yield self._values[key]
+            stack.append((parent, position + 1))
+            if include_all_levels:
+                stack.append((key, 0))
+
+    def get_items_count(self, include_all_levels: bool = True) -> int:
+        return len(self._values) if include_all_levels else self._sizes.get((), 0)
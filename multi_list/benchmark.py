@@ -1,30 +1,48 @@
-from concurrent.futures import ProcessPoolExecutor
+import sys
+from functools import partial
+from itertools import islice
+from math import isqrt
 from random import random, randint
 from time import time_ns
-from typing import Hashable
+import tracemalloc
 
 from multi_list import MultiList, MultiListPath
-from utils.benchmark import get_args, print_results, float_01
+from flat_multi_list import FlatMultiList
+from baselines import NestedLists, PathDict
+from utils.benchmark import get_args, print_results, print_memory_results, print_profile, float_01
+from utils.benchmark_suite import add_suite_arguments, run_suite, run_comparison, worker_pool, zipfian_indexes
+from utils.histogram import Histogram
+from utils.profiling import Observer, attach_observer, detach_observer
 
 
 DEFAULT_BRANCHING_PROBABILITY = 0.1
+STORAGES = {"linked": MultiList, "flat": FlatMultiList}
+BASELINES = {"nested_lists": NestedLists, "path_dict": PathDict}
 VALUE_GENERATION_RANGE = (0, 255)
 # VALUE_GENERATION_RANGE = (-2147483648, 2147483647)
+DEEP_TREE_DEPTH = 64
 
 
-class HashablePath(MultiListPath, Hashable):
-    def __hash__(self):
-        return hash(self._sequence) ^ hash(self.separator)
+def measure_memory(storage: str, nested: list) -> int:
+    tracemalloc.start()
+    lst = STORAGES[storage].from_nested(nested)
+    result = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del lst
+    return result
 
-    def __eq__(self, other: "HashablePath"):
-        return self._sequence == other._sequence and self.separator == other.separator
 
-
-def test(items_count: int, print_tree: bool = False, branching_probability: int = DEFAULT_BRANCHING_PROBABILITY):
-    lst = MultiList()
+def test(
+        items_count: int, print_tree: bool = False, branching_probability: int = DEFAULT_BRANCHING_PROBABILITY,
+        storage: str = "linked", profile: bool = False
+):
+    lst = STORAGES[storage]()
+    observer = Observer() if profile else None
+    if observer:
+        attach_observer(lst, observer)
     paths = []
     appendable_paths = []
-    result = [[], [], [], []]
+    result = [Histogram(), Histogram(), Histogram(), Histogram()]
     for _ in range(items_count):
         full_appending_time_start = time_ns()
         value_to_add = randint(*VALUE_GENERATION_RANGE)
@@ -48,21 +66,174 @@ def test(items_count: int, print_tree: bool = False, branching_probability: int
             path = MultiListPath('0')
         main_appending_time_start = time_ns()
         lst.append(value_to_add, path)
-        result[0].append(time_ns() - main_appending_time_start)
-        paths.append(HashablePath((*path, )))
-        appendable_paths.append(HashablePath((*path, )))
-        result[1].append(time_ns() - full_appending_time_start)
+        result[0].add(time_ns() - main_appending_time_start)
+        paths.append(path)
+        appendable_paths.append(path)
+        result[1].add(time_ns() - full_appending_time_start)
+    # printing and measuring memory are not profiled
+    if observer:
+        detach_observer(lst)
     if print_tree:
         lst.print_all()
+    memory = measure_memory(storage, lst.to_nested())
+    if observer:
+        attach_observer(lst, observer)
     for path in paths:
         searching_time_start = time_ns()
         lst.find(path)
-        result[2].append(time_ns() - searching_time_start)
+        result[2].add(time_ns() - searching_time_start)
     for path in reversed(paths):
         deleting_time_start = time_ns()
         lst.delete(path)
-        result[3].append(time_ns() - deleting_time_start)
-    return *result,
+        result[3].add(time_ns() - deleting_time_start)
+    return *result, memory, observer.stats if observer else None
+
+
+def sequential_paths(count: int) -> list:
+    return [MultiListPath((i, )) for i in range(count)]
+
+
+def wide_tree_paths(count: int) -> list:
+    """
+    Paths of a tree of two levels with about sqrt(count) nodes in every branch, parents go before their children
+    """
+    width = max(1, isqrt(count))
+    paths = [MultiListPath((i, )) for i in range(width)]
+    paths.extend(MultiListPath((i, j)) for i in range(width) for j in range(width))
+    return paths[:count]
+
+
+def deep_tree_paths(count: int) -> list:
+    """
+    Paths of chains of DEEP_TREE_DEPTH nodes, where every node except the last one has a single child
+    """
+    return [
+        MultiListPath((i // DEEP_TREE_DEPTH, *(0 for _ in range(i % DEEP_TREE_DEPTH)))) for i in range(count)
+    ]
+
+
+def build(storage: str, paths: list, rng, recorder, record_appends: bool = True):
+    lst = recorder.observe((STORAGES.get(storage) or BASELINES[storage])())
+    for path in paths:
+        value = rng.randint(*VALUE_GENERATION_RANGE)
+        start = time_ns()
+        lst.append(value, path)
+        if record_appends:
+            recorder.add("append", time_ns() - start)
+    return lst
+
+
+def find_all(lst, paths, recorder):
+    for path in paths:
+        start = time_ns()
+        lst.find(path)
+        recorder.add("find", time_ns() - start)
+
+
+def delete_all(lst, paths, recorder):
+    for path in paths:
+        start = time_ns()
+        lst.delete(path)
+        recorder.add("delete", time_ns() - start)
+
+
+def tree_workload(make_paths, count, recorder, rng, args, storage="linked"):
+    paths = make_paths(count)
+    lst = build(storage, paths, rng, recorder)
+    find_all(lst, paths, recorder)
+    delete_all(lst, reversed(paths), recorder)
+
+
+def reverse_workload(count, recorder, rng, args, storage="linked"):
+    """
+    Every item is appended to the beginning of the level 0 and deleted from there
+    """
+    lst = build(storage, (MultiListPath((0, )) for _ in range(count)), rng, recorder)
+    find_all(lst, sequential_paths(count), recorder)
+    delete_all(lst, (MultiListPath((0, )) for _ in range(count)), recorder)
+
+
+def zipfian_workload(count, recorder, rng, args, storage="linked"):
+    paths = wide_tree_paths(count)
+    lst = build(storage, paths, rng, recorder, record_appends=False)
+    find_all(lst, (paths[i] for i in zipfian_indexes(len(paths), count, rng)), recorder)
+
+
+def mixed_workload(count, recorder, rng, args, storage="linked"):
+    """
+    Makes count lookups and changes (appending or deleting the first item of a random branch) in a wide tree
+    """
+    paths = wide_tree_paths(count)
+    lst = build(storage, paths, rng, recorder, record_appends=False)
+    width = lst.get_items_count(include_all_levels=False)
+    sizes = [0] * width
+    for path in paths:
+        if len(path) > 1:
+            sizes[path[0]] += 1
+    for _ in range(count):
+        branch = rng.randrange(width)
+        if rng.random() < args.read_ratio:
+            path = MultiListPath((branch, rng.randrange(sizes[branch]))) if sizes[branch] else MultiListPath((branch, ))
+            start = time_ns()
+            lst.find(path)
+            recorder.add("find", time_ns() - start)
+        elif sizes[branch] and rng.random() < 0.5:
+            path = MultiListPath((branch, 0))
+            start = time_ns()
+            lst.delete(path)
+            recorder.add("delete", time_ns() - start)
+            sizes[branch] -= 1
+        else:
+            path = MultiListPath((branch, 0))
+            value = rng.randint(*VALUE_GENERATION_RANGE)
+            start = time_ns()
+            lst.append(value, path)
+            recorder.add("append", time_ns() - start)
+            sizes[branch] += 1
+
+
+def range_scan_workload(count, recorder, rng, args, storage="linked"):
+    """
+    Reads scan_length neighbouring items from random positions of random branches of a wide tree
+    """
+    paths = wide_tree_paths(count)
+    lst = build(storage, paths, rng, recorder, record_appends=False)
+    width = lst.get_items_count(include_all_levels=False)
+    for _ in range(max(1, count // args.scan_length)):
+        branch = MultiListPath((rng.randrange(width), ))
+        position = rng.randrange(width)
+        start = time_ns()
+        for _ in islice(lst.iterate(branch, include_all_levels=False), position, position + args.scan_length):
+            pass
+        recorder.add("scan", time_ns() - start)
+
+
+WORKLOADS = {
+    "sequential": partial(tree_workload, sequential_paths),
+    "reverse": reverse_workload,
+    "wide": partial(tree_workload, wide_tree_paths),
+    "deep": partial(tree_workload, deep_tree_paths),
+    "zipfian": zipfian_workload,
+    "mixed": mixed_workload,
+    "range_scan": range_scan_workload
+}
+
+
+def run_workloads(args):
+    storages = STORAGES if args.storage == "all" else (args.storage, )
+    names = WORKLOADS if args.workload in (None, "all") else (args.workload, )
+    if args.baselines:
+        return run_comparison(
+            {name: {storage: partial(WORKLOADS[name], storage=storage) for storage in (*storages, *BASELINES)}
+             for name in names},
+            args.sizes or (args.count, ), args
+        )
+    workloads = {
+        (name if len(storages) == 1 else f"{name} [{storage}]"): partial(WORKLOADS[name], storage=storage)
+        for storage in storages for name in names
+    }
+    if not run_suite(workloads, args):
+        sys.exit(1)
 
 
 def main():
@@ -71,26 +242,43 @@ def main():
             "-b", "--branching_probability",
             help="Probability of making an attempt to create a new branch while appending an item",
             type=float_01, required=False, default=DEFAULT_BRANCHING_PROBABILITY
-        )
+        ),
+        lambda parser: parser.add_argument(
+            "-s", "--storage",
+            help="Storage of the multi-list nodes: linked nodes, flat arrays, or all of them one after another",
+            choices=(*STORAGES, "all"), required=False, default="linked"
+        ),
+        lambda parser: add_suite_arguments(parser, WORKLOADS)
     ])
-    executor = ProcessPoolExecutor()
-    addition_time = []
-    full_addition_time = []
-    search_time = []
-    deletion_time = []
-    try:
-        for addition, full_addition, search, deletion in executor.map(
-                test, *zip(*((args.count, args.print, args.branching_probability) for _ in range(args.iterations)))
-        ):
-            addition_time.extend(addition)
-            full_addition_time.extend(full_addition)
-            search_time.extend(search)
-            deletion_time.extend(deletion)
-    finally:
-        executor.shutdown(wait=False, cancel_futures=True)
-    for name, results in (("Clear addition", addition_time), ("Full addition", full_addition_time),
-                          ("Search", search_time), ("Deletion", deletion_time)):
-        print_results(name, results)
+    if args.workload or args.baselines:
+        return run_workloads(args)
+    with worker_pool() as executor:
+        for storage in (STORAGES if args.storage == "all" else (args.storage, )):
+            addition_time = Histogram()
+            full_addition_time = Histogram()
+            search_time = Histogram()
+            deletion_time = Histogram()
+            memory = []
+            observer = Observer()
+            for addition, full_addition, search, deletion, used_memory, stats in executor.map(
+                    test, *zip(*(
+                        (args.count, args.print, args.branching_probability, storage, args.profile)
+                        for _ in range(args.iterations)
+                    ))
+            ):
+                observer.merge(stats or {})
+                addition_time.merge(addition)
+                full_addition_time.merge(full_addition)
+                search_time.merge(search)
+                deletion_time.merge(deletion)
+                memory.append(used_memory)
+            print(f"Storage: {storage}")
+            for name, results in (("Clear addition", addition_time), ("Full addition", full_addition_time),
+                                  ("Search", search_time), ("Deletion", deletion_time)):
+                print_results(name, results)
+            print_memory_results("Structure", memory, args.count)
+            if args.profile:
+                print_profile(observer.summary())
 
 
 if __name__ == "__main__":
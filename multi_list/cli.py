@@ -1,5 +1,5 @@
 from multi_list import MultiList, MultiListPath
-from utils.cli import CommandInterface
+from utils.cli import CommandInterface, OPTIONS_HELP
 
 
 class MultiListCommandInterface(CommandInterface):
@@ -23,7 +23,7 @@ class MultiListCommandInterface(CommandInterface):
             "delete": self.delete_item,
             "delete-level": self.delete_level,
             "delete-branch": self.delete_branch,
-            "copy": lambda action: self.copy(action, 'make_full_copy'),
+            "copy": lambda action: self.copy(action, 'make_shared_copy'),
             "clear": self.clear
         }
 
@@ -48,6 +48,7 @@ class MultiListCommandInterface(CommandInterface):
             "delete-branch PATH - delete branch of multi-list, which parent is at PATH\n"
             "copy make|restore|switch|delete - control the copy of list\n"
             "clear - clear the multi-list\n"
+            + OPTIONS_HELP
         )
 
     def control_path_separator(self, action: str, separator: str = None):
@@ -167,6 +168,6 @@ class MultiListCommandInterface(CommandInterface):
 
 if __name__ == "__main__":
     try:
-        MultiListCommandInterface()()
+        MultiListCommandInterface().run()
     except (KeyboardInterrupt, EOFError):
         print("\nExit")
@@ -0,0 +1,202 @@
+import argparse
+from random import Random
+from threading import Thread, Event
+from time import time_ns
+
+from multi_list import MultiList, MultiListPath
+from concurrent_multi_list import ConcurrentMultiList
+from utils.benchmark import get_args, print_results, positive_int, float_01
+
+
+DEFAULT_THREADS_COUNT = 4
+DEFAULT_READ_RATIO = 0.8
+INITIAL_BRANCH_SIZE = 16
+VALUE_GENERATION_RANGE = (0, 255)
+MOVED_ITEMS_COUNT = 32
+
+
+def make_list(threads_count: int, branch_locks: bool, extra_branches: int = 0) -> ConcurrentMultiList:
+    """
+    Builds a list where every thread owns a level 0 node with a branch of INITIAL_BRANCH_SIZE items
+    """
+    lst = ConcurrentMultiList(branch_locks)
+    for thread in range(threads_count + extra_branches):
+        lst.append(thread, MultiListPath((thread, )))
+        for position in range(INITIAL_BRANCH_SIZE):
+            lst.append(position, MultiListPath((thread, position)))
+    return lst
+
+
+def run_threads(targets: list) -> int:
+    threads = [Thread(target=target) for target in targets]
+    start = time_ns()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time_ns() - start
+
+
+def throughput_test(count: int, threads_count: int, read_ratio: float, branch_locks: bool, print_tree: bool):
+    """
+    Every thread makes count random lookups and changes in its own branch
+    """
+    lst = make_list(threads_count, branch_locks)
+    read_time = []
+    write_time = []
+
+    def work(thread: int):
+        rng = Random(thread)
+        size = INITIAL_BRANCH_SIZE
+        for _ in range(count):
+            if rng.random() < read_ratio:
+                path = MultiListPath((thread, rng.randrange(size)))
+                start = time_ns()
+                lst.find(path)
+                read_time.append(time_ns() - start)
+                continue
+            start = time_ns()
+            if size > 1 and rng.random() < 0.5:
+                lst.delete(MultiListPath((thread, rng.randrange(size))))
+                size -= 1
+            else:
+                lst.append(rng.randint(*VALUE_GENERATION_RANGE), MultiListPath((thread, rng.randint(0, size))))
+                size += 1
+            write_time.append(time_ns() - start)
+
+    elapsed = run_threads([lambda thread=thread: work(thread) for thread in range(threads_count)])
+    if print_tree:
+        lst.print_all()
+    return read_time, write_time, elapsed
+
+
+def stress_test(count: int, threads_count: int, branch_locks: bool) -> list:
+    """
+    Writers change their own branches and replay the same changes on private lists,
+    a mover moves and swaps items between two more branches, and readers check that no moved item is lost
+    or duplicated in any snapshot. Returns a list of found problems
+    """
+    lst = make_list(threads_count, branch_locks, extra_branches=2)
+    first, second = threads_count, threads_count + 1
+    lst.delete_child(MultiListPath((first, )))
+    lst.delete_child(MultiListPath((second, )))
+    for position in range(MOVED_ITEMS_COUNT):
+        lst.append(position, MultiListPath((first, position)))
+    expected_branches = [None] * threads_count
+    problems = []
+    stop = Event()
+
+    def write(thread: int):
+        rng = Random(thread)
+        reference = MultiList.from_nested([(thread, [(position, None) for position in range(INITIAL_BRANCH_SIZE)])])
+        size = INITIAL_BRANCH_SIZE
+        for _ in range(count):
+            position = rng.randrange(size)
+            action = rng.random()
+            if action < 0.3 and size > 1:
+                changes = ((lst.delete, reference.delete), ())
+                size -= 1
+            elif action < 0.6:
+                value = rng.randint(*VALUE_GENERATION_RANGE)
+                changes = ((lst.change_value, reference.change_value), (value, ))
+            else:
+                value = rng.randint(*VALUE_GENERATION_RANGE)
+                changes = ((lst.append, reference.append), (value, ))
+                size += 1
+            (change, reference_change), args = changes
+            change(*args, MultiListPath((thread, position)))
+            reference_change(*args, MultiListPath((0, position)))
+        expected_branches[thread] = reference.to_nested()[0]
+
+    def move():
+        rng = Random(-1)
+        sizes = {first: MOVED_ITEMS_COUNT, second: 0}
+        while not stop.is_set():
+            source = first if sizes[first] and (not sizes[second] or rng.random() < 0.5) else second
+            destination = second if source == first else first
+            if sizes[first] and sizes[second] and rng.random() < 0.3:
+                lst.swap(
+                    MultiListPath((first, rng.randrange(sizes[first]))),
+                    MultiListPath((second, rng.randrange(sizes[second])))
+                )
+                continue
+            lst.move(
+                MultiListPath((source, rng.randrange(sizes[source]))),
+                MultiListPath((destination, rng.randint(0, sizes[destination])))
+            )
+            sizes[source] -= 1
+            sizes[destination] += 1
+
+    def read():
+        while not stop.is_set():
+            nested = lst.to_nested()
+            moved = sorted(value for _, children in nested[first:] for value, _ in children or ())
+            if moved != list(range(MOVED_ITEMS_COUNT)):
+                problems.append(f"Moved items are lost or duplicated: {moved}")
+                return
+
+    def write_all():
+        writers = [Thread(target=write, args=(thread, )) for thread in range(threads_count)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        stop.set()
+
+    run_threads([write_all, move, read, read])
+    nested = lst.to_nested()
+    for thread in range(threads_count):
+        if nested[thread] != expected_branches[thread]:
+            problems.append(f"Branch {thread} differs from its reference")
+    return problems
+
+
+def main():
+    args = get_args([
+        lambda parser: parser.add_argument(
+            "-t", "--threads", help="Count of threads", type=positive_int, required=False,
+            default=DEFAULT_THREADS_COUNT
+        ),
+        lambda parser: parser.add_argument(
+            "-r", "--read_ratio", help="Share of lookups among the operations of every thread",
+            type=float_01, required=False, default=DEFAULT_READ_RATIO
+        ),
+        lambda parser: parser.add_argument(
+            "--branch_locks", help="Lock branches of level 0 nodes separately",
+            required=False, action=argparse.BooleanOptionalAction, default=False
+        ),
+        lambda parser: parser.add_argument(
+            "--check", help="Run a stress test which checks consistency instead of measuring throughput",
+            required=False, action=argparse.BooleanOptionalAction, default=False
+        )
+    ])
+    if args.check:
+        for iteration in range(args.iterations):
+            problems = stress_test(args.count, args.threads, args.branch_locks)
+            for problem in problems:
+                print(problem)
+            print(f"Iteration {iteration}: {'failed' if problems else 'passed'}")
+        return
+    read_time = []
+    write_time = []
+    operations_count = 0
+    elapsed = 0
+    for _ in range(args.iterations):
+        reads, writes, iteration_time = throughput_test(
+            args.count, args.threads, args.read_ratio, args.branch_locks, args.print
+        )
+        read_time.extend(reads)
+        write_time.extend(writes)
+        operations_count += len(reads) + len(writes)
+        elapsed += iteration_time
+    for name, results in (("Lookup", read_time), ("Change", write_time)):
+        if results:
+            print_results(name, results)
+    print("Throughput (operations/s):", operations_count / (elapsed / 1e9))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except (KeyboardInterrupt, EOFError):
+        print("\nExit")
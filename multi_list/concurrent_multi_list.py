@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+from typing import Any, Iterator, TextIO
+
+from multi_list import MultiList, MultiListPath
+from utils.locks import ReadWriteLock
+
+
+DEFAULT_BRANCH_LOCKS_COUNT = 64
+
+
+class ConcurrentMultiList(MultiList):
+    """
+    Thread-safe multi-list guarded by a readers-writer lock: lookups run in parallel, changes are exclusive,
+    so move and swap are atomic. With branch_locks enabled, changes inside the branch of a level 0 node
+    hold the main lock as readers plus a lock of that branch (locks are striped by the level 0 node),
+    so changes in disjoint branches do not wait for each other
+    """
+    __slots__ = ("_lock", "_branch_locks")
+
+    def __init__(self, branch_locks: bool = False, branch_locks_count: int = DEFAULT_BRANCH_LOCKS_COUNT):
+        super().__init__()
+        self._lock = ReadWriteLock()
+        self._branch_locks = [ReadWriteLock() for _ in range(branch_locks_count)] if branch_locks else None
+
+    def _get_branch_lock(self, path: MultiListPath) -> ReadWriteLock:
+        node = self.root
+        for _ in range(path[0]):
+            if not node:
+                break
+            node = node.right
+        return self._branch_locks[hash(node) % len(self._branch_locks)]
+
+    @contextmanager
+    def _locked(self, write: bool, path: MultiListPath | None = None):
+        """
+        Locks the whole list, or only the branch of the level 0 node on path if branch locks are enabled.
+        Changes of shared (copy-on-write) lists always lock the whole list, because they copy level 0 nodes
+        """
+        if self._branch_locks is None:
+            self._lock.acquire(write)
+            try:
+                yield
+            finally:
+                self._lock.release(write)
+            return
+        if path is None:
+            if write:
+                with self._lock.write_locked():
+                    yield
+                return
+            with self._lock.read_locked():
+                for lock in self._branch_locks:
+                    lock.acquire_read()
+                try:
+                    yield
+                finally:
+                    for lock in self._branch_locks:
+                        lock.release_read()
+            return
+        self._lock.acquire_read()
+        if write and self._owner is not None:
+            self._lock.release_read()
+            with self._lock.write_locked():
+                yield
+            return
+        try:
+            branch_lock = self._get_branch_lock(path)
+            branch_lock.acquire(write)
+            try:
+                yield
+            finally:
+                branch_lock.release(write)
+        finally:
+            self._lock.release_read()
+
+    def set_path_cache_size(self, size: int):
+        if size > 0:
+            raise ValueError("Path cache is not supported by concurrent multi-list")
+
+    def exists(self, path: MultiListPath) -> bool:
+        with self._locked(False, path or None):
+            return super().exists(path)
+
+    def find(self, path: MultiListPath):
+        with self._locked(False, path or None):
+            return super().find(path)
+
+    def iterate(self, path: MultiListPath | None = None, include_all_levels: bool = True) -> Iterator[Any]:
+        # the values are collected under the lock, so the list may change while they are being consumed
+        with self._locked(False, path or None):
+            return iter(list(super().iterate(path, include_all_levels)))
+
+    def get_items_count(self, include_all_levels: bool = True) -> int:
+        with self._locked(False):
+            return super().get_items_count(include_all_levels)
+
+    def deepest_level_number(self, level: int = 0):
+        with self._locked(False):
+            return super().deepest_level_number(level)
+
+    def to_nested(self):
+        with self._locked(False):
+            return super().to_nested()
+
+    def render(self, stream: TextIO | None = None, *args, **kwargs):
+        with self._locked(False):
+            return super().render(stream, *args, **kwargs)
+
+    def make_full_copy(self) -> MultiList:
+        with self._locked(False):
+            return super().make_full_copy()
+
+    def make_shared_copy(self) -> MultiList:
+        with self._locked(True):
+            return super().make_shared_copy()
+
+    def append(self, value, path: MultiListPath):
+        with self._locked(True, path if len(path) > 1 else None):
+            super().append(value, path)
+
+    def delete(self, path: MultiListPath):
+        with self._locked(True, path if len(path) > 1 else None):
+            super().delete(path)
+
+    def change_value(self, new_value, path: MultiListPath):
+        with self._locked(True, path or None):
+            super().change_value(new_value, path)
+
+    def move(self, source_path: MultiListPath, destination_path: MultiListPath):
+        with self._locked(True):
+            super().move(source_path, destination_path)
+
+    def swap(self, path1: MultiListPath, path2: MultiListPath):
+        with self._locked(True):
+            super().swap(path1, path2)
+
+    def delete_level(self, level_number: int):
+        with self._locked(True):
+            if level_number == 0:
+                return MultiList.__init__(self)
+            super().delete_level(level_number)
+
+    def delete_child(self, path: MultiListPath):
+        with self._locked(True, path or None):
+            super().delete_child(path)
+
+    def clear(self):
+        with self._locked(True):
+            MultiList.__init__(self)
@@ -0,0 +1,382 @@
+import sys
+from array import array
+from typing import Iterable, Iterator, Tuple, Any, List, TextIO
+
+from multi_list import MultiListPath
+from utils.profiling import observable
+from utils.render import truncate, render_tree_levels, format_text_value
+
+
+NO_NODE = -1
+INDEX_TYPECODE = "q"
+ROOT = 0
+
+
+def _observed_find_node(self: "FlatMultiList", path: MultiListPath) -> int:
+    observer = self._observer
+    observer.count("path_length", len(path))
+    if not path:
+        return NO_NODE
+    node = ROOT
+    hops = 0
+    try:
+        for index in path:
+            assert index >= 0
+            node = self._first_child[node]
+            hops += 1
+            for _ in range(index):
+                if node == NO_NODE:
+                    return NO_NODE
+                node = self._next_sibling[node]
+                hops += 1
+            if node == NO_NODE:
+                return NO_NODE
+        return node
+    finally:
+        observer.count("pointer_hops", hops)
+
+
+def _observed_allocate(self: "FlatMultiList", value, parent: int) -> int:
+    index = self._observed_class._allocate(self, value, parent)
+    self._observer.count("allocations")
+    return index
+
+
+@observable(
+    (
+        "append", "delete", "find", "exists", "change_value", "move", "swap", "delete_level", "delete_child",
+        "make_full_copy", "get_items_count", "deepest_level_number", "to_nested", "render", "clear"
+    ),
+    {"_find_node": _observed_find_node, "_allocate": _observed_allocate}
+)
+class FlatMultiList:
+    """
+    Multi-list with the same interface as MultiList, which keeps the nodes in flat array columns
+    (first child, next sibling, parent, branch size) instead of separate node and branch objects.
+    Slot 0 is a virtual root whose children are the items of the level 0. Freed slots are reused
+    """
+    __slots__ = ("_values", "_first_child", "_next_sibling", "_parent", "_branch_size", "_free", "_nodes_count")
+
+    def __init__(self):
+        self._values: List[Any] = [None]
+        self._first_child = array(INDEX_TYPECODE, (NO_NODE, ))
+        self._next_sibling = array(INDEX_TYPECODE, (NO_NODE, ))
+        self._parent = array(INDEX_TYPECODE, (NO_NODE, ))
+        self._branch_size = array(INDEX_TYPECODE, (0, ))
+        self._free = array(INDEX_TYPECODE)
+        self._nodes_count = 0
+
+    @classmethod
+    def from_nested(cls, items: Iterable[Tuple[Any, Iterable | None]]) -> "FlatMultiList":
+        result = cls()
+        stack: List[list] = [[ROOT, NO_NODE, iter(items)]]
+        while stack:
+            frame = stack[-1]
+            for value, children in frame[2]:
+                index = result._allocate(value, frame[0])
+                if frame[1] == NO_NODE:
+                    result._first_child[frame[0]] = index
+                else:
+                    result._next_sibling[frame[1]] = index
+                frame[1] = index
+                result._branch_size[frame[0]] += 1
+                if children is not None:
+                    stack.append([index, NO_NODE, iter(children)])
+                    break
+            else:
+                stack.pop()
+        return result
+
+    def to_nested(self) -> List[Tuple[Any, list | None]]:
+        result = []
+        stack: List[Tuple[list, int]] = [(result, self._first_child[ROOT])]
+        while stack:
+            target, index = stack.pop()
+            while index != NO_NODE:
+                children = [] if self._first_child[index] != NO_NODE else None
+                target.append((self._values[index], children))
+                if children is not None:
+                    stack.append((target, self._next_sibling[index]))
+                    target, index = children, self._first_child[index]
+                else:
+                    index = self._next_sibling[index]
+        return result
+
+    def _allocate(self, value, parent: int) -> int:
+        self._nodes_count += 1
+        if self._free:
+            index = self._free.pop()
+            self._values[index] = value
+            self._first_child[index] = NO_NODE
+            self._next_sibling[index] = NO_NODE
+            self._parent[index] = parent
+            self._branch_size[index] = 0
+            return index
+        self._values.append(value)
+        self._first_child.append(NO_NODE)
+        self._next_sibling.append(NO_NODE)
+        self._parent.append(parent)
+        self._branch_size.append(0)
+        return len(self._values) - 1
+
+    def _free_children(self, index: int):
+        stack = [self._first_child[index]]
+        while stack:
+            child = stack.pop()
+            while child != NO_NODE:
+                if self._first_child[child] != NO_NODE:
+                    stack.append(self._first_child[child])
+                self._values[child] = None
+                self._free.append(child)
+                self._nodes_count -= 1
+                child = self._next_sibling[child]
+        self._first_child[index] = NO_NODE
+        self._branch_size[index] = 0
+
+    def _free_node(self, index: int):
+        self._free_children(index)
+        self._values[index] = None
+        self._free.append(index)
+        self._nodes_count -= 1
+
+    def _iterate(self, include_all_levels: bool = True, parent: int = ROOT):
+        stack = [self._first_child[parent]]
+        while stack:
+            index = stack.pop()
+            while index != NO_NODE:
+                yield index
+                if include_all_levels and self._first_child[index] != NO_NODE:
+                    stack.append(self._next_sibling[index])
+                    index = self._first_child[index]
+                else:
+                    index = self._next_sibling[index]
+
+    def iterate(self, path: MultiListPath | None = None, include_all_levels: bool = True) -> Iterator[Any]:
+        """
+        Yields values of the whole list (or of the branch under the node at path) in pre-order
+        """
+        parent = ROOT
+        if path:
+            parent = self._find_node(path)
+            if parent == NO_NODE:
+                raise LookupError("Path does not exist")
+        for node in self._iterate(include_all_levels, parent):
+            yield self._values[node]
+
+    def _find_node(self, path: MultiListPath) -> int:
+        if not path:
+            return NO_NODE
+        node = ROOT
+        for index in path:
+            assert index >= 0
+            node = self._first_child[node]
+            for _ in range(index):
+                if node == NO_NODE:
+                    return NO_NODE
+                node = self._next_sibling[node]
+            if node == NO_NODE:
+                return NO_NODE
+        return node
+
+    def _find_parent(self, path: MultiListPath) -> int:
+        return ROOT if len(path) == 1 else self._find_node(path[:-1])
+
+    def _iterate_branch_values(
+            self, parent: int, parent_path: MultiListPath | None, next_branches: list | None,
+            path_separator: str, head: int | None, tail: int | None
+    ):
+        children = self._iterate(include_all_levels=False, parent=parent)
+        for position, node in truncate(children, self._branch_size[parent], head, tail):
+            if position is None:
+                yield None, node
+                continue
+            if next_branches is not None and self._first_child[node] != NO_NODE:
+                next_branches.append((
+                    MultiListPath((*(parent_path or tuple()), position), separator=path_separator), node
+                ))
+            yield position, self._values[node]
+
+    def _iterate_levels(
+            self, level: int = 0, path_separator: str = "/", head: int | None = None, tail: int | None = None,
+            max_depth: int | None = None
+    ):
+        branches: List[Tuple[MultiListPath | None, int]] = [(None, ROOT)]
+        depth = 0
+        while branches:
+            next_branches = [] if max_depth is None or depth < max_depth else None
+            yield level + depth, (
+                (parent_path, self._iterate_branch_values(
+                    parent, parent_path, next_branches, path_separator, head, tail
+                ))
+                for parent_path, parent in branches
+            )
+            branches = next_branches
+            depth += 1
+
+    def render(
+            self, stream: TextIO | None = None, output_format: str = "text", level: int = 0,
+            path_separator: str = None, highlight_string_values: bool = False,
+            head: int | None = None, tail: int | None = None, max_depth: int | None = None
+    ):
+        render_tree_levels(
+            self._iterate_levels(level, path_separator or MultiListPath('').separator, head, tail, max_depth),
+            stream or sys.stdout, output_format, "Level {} -", "MultiList",
+            lambda value: format_text_value(value, highlight_string_values)
+        )
+
+    def print_all(self, level: int = 0, path_separator: str = None, highlight_string_values: bool = False):
+        self.render(level=level, path_separator=path_separator, highlight_string_values=highlight_string_values)
+
+    def deepest_level_number(self, level: int = 0):
+        max_deep = level
+        stack = [(self._first_child[ROOT], level)]
+        while stack:
+            index, current_level = stack.pop()
+            while index != NO_NODE:
+                if self._first_child[index] != NO_NODE:
+                    max_deep = max(max_deep, current_level + 1)
+                    stack.append((self._first_child[index], current_level + 1))
+                index = self._next_sibling[index]
+        return max_deep
+
+    def exists(self, path: MultiListPath) -> bool:
+        return self._find_node(path) != NO_NODE
+
+    def find(self, path: MultiListPath):
+        node = self._find_node(path)
+        if node == NO_NODE:
+            raise LookupError("Path does not exist")
+        return self._values[node]
+
+    def change_value(self, new_value, path: MultiListPath):
+        node = self._find_node(path)
+        if node == NO_NODE:
+            raise LookupError("Path does not exist")
+        self._values[node] = new_value
+
+    def _link(self, node: int, parent: int, position: int):
+        if position == 0:
+            self._next_sibling[node] = self._first_child[parent]
+            self._first_child[parent] = node
+        else:
+            previous = self._first_child[parent]
+            for _ in range(position - 1):
+                previous = self._next_sibling[previous]
+            self._next_sibling[node] = self._next_sibling[previous]
+            self._next_sibling[previous] = node
+        self._parent[node] = parent
+        self._branch_size[parent] += 1
+
+    def _unlink(self, parent: int, position: int) -> int:
+        if position == 0:
+            node = self._first_child[parent]
+            self._first_child[parent] = self._next_sibling[node]
+        else:
+            previous = self._first_child[parent]
+            for _ in range(position - 1):
+                previous = self._next_sibling[previous]
+            node = self._next_sibling[previous]
+            self._next_sibling[previous] = self._next_sibling[node]
+        self._next_sibling[node] = NO_NODE
+        self._branch_size[parent] -= 1
+        return node
+
+    def _append(self, value, path: MultiListPath) -> int:
+        assert path[-1] >= 0
+        parent = self._find_parent(path)
+        if parent == NO_NODE or self._branch_size[parent] < path[-1]:
+            raise LookupError("Path does not exist")
+        node = self._allocate(value, parent)
+        self._link(node, parent, path[-1])
+        return node
+
+    def append(self, value, path: MultiListPath):
+        self._append(value, path)
+
+    def delete(self, path: MultiListPath):
+        assert path[-1] >= 0
+        parent = self._find_parent(path)
+        if parent == NO_NODE or self._branch_size[parent] <= path[-1]:
+            raise LookupError("Path does not exist")
+        self._free_node(self._unlink(parent, path[-1]))
+
+    def get_items_count(self, include_all_levels: bool = True) -> int:
+        return self._nodes_count if include_all_levels else self._branch_size[ROOT]
+
+    def move(self, source_path: MultiListPath, destination_path: MultiListPath):
+        """
+        Same as MultiList.move: destination_path should be specified as if source node was already removed
+        """
+        assert source_path[-1] >= 0 and destination_path[-1] >= 0
+        if source_path == destination_path:
+            raise ValueError("Source and destination paths cannot be the same")
+        if destination_path.startswith(source_path):
+            raise ValueError("Such move would create a loop")
+        source_parent = self._find_parent(source_path)
+        if source_parent == NO_NODE or self._branch_size[source_parent] <= source_path[-1]:
+            raise LookupError("Source path does not exist")
+        node = self._unlink(source_parent, source_path[-1])
+        destination_parent = self._find_parent(destination_path)
+        if destination_parent == NO_NODE or self._branch_size[destination_parent] < destination_path[-1]:
+            self._link(node, source_parent, source_path[-1])
+            raise LookupError("Destination path does not exist")
+        self._link(node, destination_parent, destination_path[-1])
+
+    def swap(self, path1: MultiListPath, path2: MultiListPath):
+        if path1.startswith(path2) or path2.startswith(path1):
+            raise ValueError("Such move would create a loop")
+        node1 = self._find_node(path1)
+        if node1 == NO_NODE:
+            raise LookupError("path1 does not exist")
+        node2 = self._find_node(path2)
+        if node2 == NO_NODE:
+            raise LookupError("path2 does not exist")
+        for column in (self._values, self._first_child, self._branch_size):
+            column[node1], column[node2] = column[node2], column[node1]
+        for node in (node1, node2):
+            for child in self._iterate(include_all_levels=False, parent=node):
+                self._parent[child] = node
+
+    def delete_level(self, level_number: int):
+        if level_number < 0:
+            raise ValueError("Level must be more than 0")
+        elif level_number == 0:
+            return self.clear()
+        parents = [ROOT]
+        for _ in range(level_number):
+            parents = [child for parent in parents for child in self._iterate(include_all_levels=False, parent=parent)]
+        for parent in parents:
+            self._free_children(parent)
+
+    def make_full_copy(self) -> "FlatMultiList":
+        result = FlatMultiList()
+        result._values = self._values.copy()
+        for column in ("_first_child", "_next_sibling", "_parent", "_branch_size", "_free"):
+            setattr(result, column, array(INDEX_TYPECODE, getattr(self, column)))
+        result._nodes_count = self._nodes_count
+        return result
+
+    def delete_child(self, path: MultiListPath):
+        node = self._find_node(path)
+        if node == NO_NODE:
+            raise LookupError("Path does not exist")
+        if self._first_child[node] == NO_NODE:
+            raise LookupError("Node at this path has no child")
+        self._free_children(node)
+
+    def get_path(self, node: int) -> MultiListPath:
+        """
+        Restores the path of the node by following parent pointers
+        """
+        result = []
+        while node != ROOT:
+            parent = self._parent[node]
+            position, sibling = 0, self._first_child[parent]
+            while sibling != node:
+                position, sibling = position + 1, self._next_sibling[sibling]
+            result.append(position)
+            node = parent
+        return MultiListPath(reversed(result))
+
+    def clear(self):
+        self.__init__()
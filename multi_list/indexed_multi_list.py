@@ -0,0 +1,172 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from multi_list import MultiList, MultiListNode, MultiListPath
+
+
+class IndexedMultiList(MultiList):
+    """
+    Multi-list with a secondary index from values to the nodes which hold them.
+    Every node remembers its branch and every branch remembers its parent node, so paths are restored
+    on demand and the index is updated in O(1) per added, moved, swapped or changed node.
+    Deleting a branch removes its nodes from the index, which takes time proportional to its size.
+    Values must be hashable
+    """
+    __slots__ = ("_value_index", "_node_branches", "_branch_parents")
+
+    def __init__(self):
+        super().__init__()
+        self._value_index: Dict[Any, Dict[MultiListNode, None]] = {}
+        self._node_branches: Dict[MultiListNode, MultiList] = {}
+        self._branch_parents: Dict[MultiList, MultiListNode] = {}
+
+    @classmethod
+    def from_nested(cls, items: Iterable[Tuple[Any, Iterable | None]]) -> "IndexedMultiList":
+        result = super().from_nested(items)
+        result._register_branch(result)
+        return result
+
+    def _register(self, node: MultiListNode, branch: MultiList):
+        self._node_branches[node] = branch
+        self._value_index.setdefault(node.value, {})[node] = None
+        if node.child:
+            self._branch_parents[node.child] = node
+
+    def _unregister(self, node: MultiListNode):
+        del self._node_branches[node]
+        nodes = self._value_index[node.value]
+        del nodes[node]
+        if not nodes:
+            del self._value_index[node.value]
+
+    def _register_branch(self, branch: MultiList):
+        stack = [branch]
+        while stack:
+            current = stack.pop()
+            for node in current._iterate(include_all_levels=False):
+                self._register(node, current)
+                if node.child:
+                    stack.append(node.child)
+
+    def _unregister_branch(self, branch: MultiList):
+        self._branch_parents.pop(branch, None)
+        for node in branch._iterate(include_all_levels=True):
+            self._unregister(node)
+            if node.child:
+                del self._branch_parents[node.child]
+
+    def _get_path(self, node: MultiListNode) -> MultiListPath:
+        result = []
+        while True:
+            branch = self._node_branches[node]
+            position, sibling = 0, branch.root
+            while sibling is not node:
+                position, sibling = position + 1, sibling.right
+            result.append(position)
+            if branch is self:
+                return MultiListPath(reversed(result))
+            node = self._branch_parents[branch]
+
+    def _insert(self, parent_node: MultiListNode, value, position: int) -> MultiListNode:
+        hash(value)
+        node = super()._insert(parent_node, value, position)
+        self._register(node, parent_node.child)
+        if parent_node.child is not self:
+            self._branch_parents[parent_node.child] = parent_node
+        return node
+
+    def _remove(self, parent_node: MultiListNode, position: int) -> MultiListNode:
+        branch = parent_node.child
+        node = super()._remove(parent_node, position)
+        self._unregister(node)
+        if parent_node.child is None:
+            self._branch_parents.pop(branch, None)
+        return node
+
+    def _reindex(self, node: MultiListNode, old_value):
+        nodes = self._value_index[old_value]
+        del nodes[node]
+        if not nodes:
+            del self._value_index[old_value]
+        self._value_index.setdefault(node.value, {})[node] = None
+
+    def _adopt_child(self, path: MultiListPath):
+        node = self._find_node(path)
+        if node.child:
+            self._branch_parents[node.child] = node
+
+    def delete(self, path: MultiListPath):
+        node = self._delete(path)
+        if node.child:
+            self._unregister_branch(node.child)
+
+    def change_value(self, new_value, path: MultiListPath):
+        hash(new_value)
+        node = self._find_node(path)
+        if not node:
+            raise LookupError("Path does not exist")
+        old_value, node.value = node.value, new_value
+        self._reindex(node, old_value)
+
+    def move(self, source_path: MultiListPath, destination_path: MultiListPath):
+        # the moved node is recreated, so its branch has to be pointed to the new node
+        try:
+            super().move(source_path, destination_path)
+        except LookupError as err:
+            if err.args[0] == "Destination path does not exist":
+                self._adopt_child(source_path)
+            raise
+        self._adopt_child(destination_path)
+
+    def swap(self, path1: MultiListPath, path2: MultiListPath):
+        node1, node2 = self._find_node(path1), self._find_node(path2)
+        super().swap(path1, path2)
+        self._reindex(node1, node2.value)
+        self._reindex(node2, node1.value)
+        for node in (node1, node2):
+            if node.child:
+                self._branch_parents[node.child] = node
+
+    def delete_level(self, level_number: int):
+        if level_number <= 0:
+            return super().delete_level(level_number)
+        branches = [self]
+        for _ in range(level_number):
+            branches = [node.child for branch in branches for node in branch._iterate(False) if node.child]
+        for branch in branches:
+            self._unregister_branch(branch)
+        super().delete_level(level_number)
+
+    def delete_child(self, path: MultiListPath):
+        node = self._find_node(path)
+        branch = node.child if node else None
+        super().delete_child(path)
+        self._unregister_branch(branch)
+
+    def make_full_copy(self) -> "IndexedMultiList":
+        return IndexedMultiList.from_nested(self.to_nested())
+
+    def make_shared_copy(self) -> "IndexedMultiList":
+        """
+        Makes a full copy in O(n) with its own index.
+        Nodes of this list are referenced by the index, so they cannot be shared and replaced by copy-on-write
+        """
+        return self.make_full_copy()
+
+    def contains_value(self, value) -> bool:
+        return value in self._value_index
+
+    def count_value(self, value) -> int:
+        return len(self._value_index.get(value, ()))
+
+    def find_paths(self, value) -> List[MultiListPath]:
+        return [self._get_path(node) for node in self._value_index.get(value, ())]
+
+    def find_paths_where(self, predicate: Callable[[Any], bool]) -> Iterator[Tuple[MultiListPath, Any]]:
+        """
+        Yields paths and values of all nodes, which values satisfy the predicate.
+        The predicate is called once per distinct value
+        """
+        for value, nodes in list(self._value_index.items()):
+            if predicate(value):
+                for node in nodes:
+                    yield self._get_path(node), value
@@ -0,0 +1,177 @@
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, List, Tuple
+
+from multi_list import MultiList, MultiListNode, MultiListPath
+
+
+# name and arguments of the performed action, then the function and arguments which revert it
+JournalEntry = Tuple[str, tuple, Callable, tuple]
+
+
+class JournaledMultiList(MultiList):
+    """
+    Multi-list which records the inverse of every change, so changes can be undone and redone
+    and grouped into transactions. Detached nodes and branches are kept in the journal by reference
+    """
+    __slots__ = ("_undo", "_redo", "_transaction", "_transaction_starts", "_replaying")
+
+    def __init__(self, undo_limit: int | None = None):
+        super().__init__()
+        self._undo: Deque[List[JournalEntry]] = deque(maxlen=undo_limit)
+        self._redo: List[List[JournalEntry]] = []
+        self._transaction: List[JournalEntry] | None = None
+        self._transaction_starts: List[int] = []
+        self._replaying = False
+
+    def _record(self, name: str, args: tuple, inverse: Callable, inverse_args: tuple):
+        entry = (name, args, inverse, inverse_args)
+        if self._transaction is not None:
+            self._transaction.append(entry)
+        else:
+            self._undo.append([entry])
+        if not self._replaying:
+            self._redo.clear()
+
+    @staticmethod
+    def _revert(entries: List[JournalEntry]):
+        for _, _, inverse, inverse_args in reversed(entries):
+            inverse(*inverse_args)
+
+    def _restore_node(self, path: MultiListPath, node: MultiListNode):
+        self._append(node.value, path).child = node.child
+
+    def _relocate(self, source_path: MultiListPath, destination_path: MultiListPath):
+        node = self._delete(source_path)
+        self._append(node.value, destination_path).child = node.child
+
+    def _set_child(self, path: MultiListPath, child: MultiList | None):
+        if self._owner is not None:
+            self._unshare(path[:-1], path[-1] + 1)
+        node = self._find_node(path)
+        if node.child:
+            node.child._version += 1
+        node.child = child
+
+    def _set_children(self, children: List[Tuple[MultiListPath, MultiList]]):
+        for path, child in children:
+            self._set_child(path, child)
+
+    def _restore_root(self, root: MultiListNode | None, items_count: int, owner: object | None):
+        self.root, self._items_count, self._owner = root, items_count, owner
+        self._version += 1
+
+    def append(self, value, path: MultiListPath):
+        self._append(value, path)
+        self._record("append", (value, path), self._delete, (path, ))
+
+    def delete(self, path: MultiListPath):
+        node = self._delete(path)
+        self._record("delete", (path, ), self._restore_node, (path, node))
+
+    def change_value(self, new_value, path: MultiListPath):
+        old_value = self.find(path)
+        super().change_value(new_value, path)
+        self._record("change_value", (new_value, path), super().change_value, (old_value, path))
+
+    def move(self, source_path: MultiListPath, destination_path: MultiListPath):
+        super().move(source_path, destination_path)
+        self._record("move", (source_path, destination_path), self._relocate, (destination_path, source_path))
+
+    def swap(self, path1: MultiListPath, path2: MultiListPath):
+        super().swap(path1, path2)
+        self._record("swap", (path1, path2), super().swap, (path1, path2))
+
+    def delete_level(self, level_number: int):
+        if level_number <= 0:
+            return super().delete_level(level_number)
+        parents: List[Tuple[MultiListPath, MultiListNode]] = [(MultiListPath(()), MultiListNode(None, None, self))]
+        for _ in range(level_number):
+            parents = [
+                (MultiListPath((*path, index)), node)
+                for path, parent in parents if parent.child
+                for index, node in enumerate(parent.child._iterate(include_all_levels=False))
+            ]
+        children = [(path, node.child) for path, node in parents if node.child]
+        super().delete_level(level_number)
+        self._record("delete_level", (level_number, ), self._set_children, (children, ))
+
+    def delete_child(self, path: MultiListPath):
+        node = self._find_node(path)
+        child = node.child if node else None
+        super().delete_child(path)
+        self._record("delete_child", (path, ), self._set_child, (path, child))
+
+    def clear(self):
+        root, items_count, owner, path_cache = self.root, self._items_count, self._owner, self._path_cache
+        MultiList.__init__(self)
+        if path_cache is not None:
+            self.set_path_cache_size(path_cache.max_size)
+        self._record("clear", (), self._restore_root, (root, items_count, owner))
+
+    def begin(self):
+        if self._transaction is None:
+            self._transaction = []
+        self._transaction_starts.append(len(self._transaction))
+
+    def commit(self):
+        if not self._transaction_starts:
+            raise ValueError("No transaction in progress")
+        self._transaction_starts.pop()
+        if not self._transaction_starts:
+            entries, self._transaction = self._transaction, None
+            if entries:
+                self._undo.append(entries)
+
+    def rollback(self):
+        if not self._transaction_starts:
+            raise ValueError("No transaction in progress")
+        start = self._transaction_starts.pop()
+        self._revert(self._transaction[start:])
+        del self._transaction[start:]
+        if not self._transaction_starts:
+            self._transaction = None
+
+    @contextmanager
+    def transaction(self):
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self):
+        if self._transaction is not None:
+            raise ValueError("Cannot undo while a transaction is in progress")
+        if not self._undo:
+            raise LookupError("Nothing to undo")
+        entries = self._undo.pop()
+        self._revert(entries)
+        self._redo.append(entries)
+
+    def redo(self):
+        if self._transaction is not None:
+            raise ValueError("Cannot redo while a transaction is in progress")
+        if not self._redo:
+            raise LookupError("Nothing to redo")
+        entries = self._redo.pop()
+        self._replaying = True
+        self.begin()
+        try:
+            for name, args, _, _ in entries:
+                getattr(self, name)(*args)
+        finally:
+            self.commit()
+            self._replaying = False
+
+    def clear_journal(self):
+        self._undo.clear()
+        self._redo.clear()
@@ -0,0 +1,154 @@
+import mmap
+import sys
+from typing import Iterator, Sequence, Tuple, Any, List
+
+from multi_list import MultiList, MultiListPath
+from serialization import BINARY_HEADER, BINARY_INDEX_SIZE, BINARY_INDEX_TYPECODE, BINARY_NO_INDEX, \
+    read_binary_header, decode_value, load_binary, index_array_from_bytes, binary_index_lengths
+
+
+class MappedMultiList:
+    """
+    Read-only multi-list which answers queries directly from a file written by serialization.dump_binary,
+    without creating MultiListNode objects. Pickled values are read only with allow_pickle,
+    which must not be used for untrusted files
+    """
+    def __init__(self, file_name: str, allow_pickle: bool = False):
+        self.file_name = file_name
+        self.allow_pickle = allow_pickle
+        with open(file_name, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if file.seek(0, 2) else None
+        data = memoryview(self._mmap if self._mmap is not None else b"")
+        self._nodes_count, self._items_count, values_size = read_binary_header(data)
+        offset = BINARY_HEADER.size
+        arrays: List[Sequence[int]] = []
+        for length in binary_index_lengths(self._nodes_count):
+            raw = data[offset:offset + length * BINARY_INDEX_SIZE]
+            if len(raw) != length * BINARY_INDEX_SIZE:
+                raise ValueError("Invalid binary multi-list: index is truncated")
+            arrays.append(raw.cast(BINARY_INDEX_TYPECODE) if sys.byteorder == "little" else index_array_from_bytes(raw))
+            offset += length * BINARY_INDEX_SIZE
+        self._first_child, self._next_sibling, self._child_count, self._value_offsets = arrays
+        self._values = data[offset:offset + values_size]
+        if len(self._values) != values_size:
+            raise ValueError("Invalid binary multi-list: data is truncated")
+
+    def close(self):
+        for view in (self._first_child, self._next_sibling, self._child_count, self._value_offsets, self._values):
+            if isinstance(view, memoryview):
+                view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _value(self, index: int):
+        return decode_value(self._values[self._value_offsets[index]:self._value_offsets[index + 1]], self.allow_pickle)
+
+    def _find_index(self, path: MultiListPath) -> int:
+        if not path or not self._nodes_count:
+            return BINARY_NO_INDEX
+        index = 0
+        path_part_index = 0
+        for position in path:
+            assert position >= 0
+            for _ in range(position):
+                index = self._next_sibling[index]
+                if index == BINARY_NO_INDEX:
+                    return BINARY_NO_INDEX
+            path_part_index += 1
+            if path_part_index < len(path):
+                index = self._first_child[index]
+                if index == BINARY_NO_INDEX:
+                    return BINARY_NO_INDEX
+        return index
+
+    def exists(self, path: MultiListPath) -> bool:
+        return self._find_index(path) != BINARY_NO_INDEX
+
+    def find(self, path: MultiListPath):
+        index = self._find_index(path)
+        if index == BINARY_NO_INDEX:
+            raise LookupError("Path does not exist")
+        return self._value(index)
+
+    def _iterate_indexes(self, start: int, include_all_levels: bool = True) -> Iterator[int]:
+        if include_all_levels:
+            # nodes are stored in pre-order, so every branch is a contiguous range
+            end = start
+            while self._next_sibling[end] != BINARY_NO_INDEX:
+                end = self._next_sibling[end]
+            while self._first_child[end] != BINARY_NO_INDEX:
+                end = self._first_child[end]
+                while self._next_sibling[end] != BINARY_NO_INDEX:
+                    end = self._next_sibling[end]
+            yield from range(start, end + 1)
+        else:
+            index = start
+            while index != BINARY_NO_INDEX:
+                yield index
+                index = self._next_sibling[index]
+
+    def iterate(self, path: MultiListPath | None = None, include_all_levels: bool = True) -> Iterator[Any]:
+        """
+        Yields values of the whole list (or of the branch under the node at path) in pre-order
+        """
+        if path:
+            parent_index = self._find_index(path)
+            if parent_index == BINARY_NO_INDEX:
+                raise LookupError("Path does not exist")
+            start = self._first_child[parent_index]
+        else:
+            start = 0 if self._nodes_count else BINARY_NO_INDEX
+        if start == BINARY_NO_INDEX:
+            return
+        for index in self._iterate_indexes(start, include_all_levels):
+            yield self._value(index)
+
+    def iterate_with_paths(self) -> Iterator[Tuple[MultiListPath, Any]]:
+        if not self._nodes_count:
+            return
+        stack: List[Tuple[int, int]] = []
+        index, position = 0, 0
+        while index != BINARY_NO_INDEX or stack:
+            if index == BINARY_NO_INDEX:
+                parent_index, parent_position = stack.pop()
+                index, position = self._next_sibling[parent_index], parent_position + 1
+                continue
+            yield MultiListPath((*(i for _, i in stack), position)), self._value(index)
+            if self._first_child[index] != BINARY_NO_INDEX:
+                stack.append((index, position))
+                index, position = self._first_child[index], 0
+            else:
+                index, position = self._next_sibling[index], position + 1
+
+    def get_items_count(self, include_all_levels: bool = True) -> int:
+        return self._nodes_count if include_all_levels else self._items_count
+
+    def get_branch_size(self, path: MultiListPath) -> int:
+        index = self._find_index(path)
+        if index == BINARY_NO_INDEX:
+            raise LookupError("Path does not exist")
+        return self._child_count[index]
+
+    def deepest_level_number(self, level: int = 0) -> int:
+        if not self._nodes_count:
+            return level
+        max_deep = level
+        stack: List[Tuple[int, int]] = [(0, level)]
+        while stack:
+            index, current_level = stack.pop()
+            max_deep = max(max_deep, current_level)
+            while index != BINARY_NO_INDEX:
+                if self._first_child[index] != BINARY_NO_INDEX:
+                    stack.append((self._first_child[index], current_level + 1))
+                index = self._next_sibling[index]
+        return max_deep
+
+    def to_multi_list(self) -> MultiList:
+        with open(self.file_name, "rb") as file:
+            return load_binary(file, self.allow_pickle)
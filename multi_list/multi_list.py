@@ -1,8 +1,17 @@
-from typing import Optional, Iterable, Union, Deque, Tuple
-from collections import deque
+import sys
+from typing import Optional, Iterable, Iterator, Union, Tuple, List, Any, TextIO
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice
+from operator import eq
+
+from utils.profiling import observable
+from utils.render import truncate, render_tree_levels, format_text_value
 
 
 class MultiListNode:
+    __slots__ = ("value", "right", "child")
+
     def __init__(self, value, right: Optional["MultiListNode"] = None, child: Optional["MultiList"] = None):
         self.value = value
         self.right = right
@@ -13,51 +22,269 @@ class MultiListNode:
                f" child={repr(self.child) if self.child else 'None'})"
 
 
+class _OwnedMultiListNode(MultiListNode):
+    """
+    Node made by a list which has shared copies. Only such nodes pay for the owner,
+    plain nodes are never owned, so they are copied before a shared list changes them
+    """
+    __slots__ = ("owner", )
+
+    def __init__(
+            self, value, right: Optional["MultiListNode"] = None, child: Optional["MultiList"] = None,
+            owner: object | None = None
+    ):
+        super().__init__(value, right, child)
+        self.owner = owner
+
+
+_PATH_HASH_MULTIPLIER = 1000003
+_PATH_HASH_MASK = (1 << 64) - 1
+
+
+@lru_cache(maxsize=4096)
+def _parse_path(path_string: str, separator: str) -> Tuple[int, ...]:
+    return tuple(map(int, filter(None, path_string.strip().strip(separator).split(separator))))
+
+
 class MultiListPath:
+    """
+    Immutable and hashable path of a node. Parsed strings are interned,
+    and prefix slices (like path[:-1]) share the sequence of the original path instead of copying it
+    """
+    __slots__ = ("separator", "_sequence", "_length", "_hash")
+
     def __init__(self, path_sequence: Iterable[int] | str, separator: str = "/"):
         self.separator = separator
         if isinstance(path_sequence, str):
-            self._sequence = tuple(
-                int(i) for i in path_sequence.strip().strip(self.separator).split(self.separator) if i
-            )
+            self._sequence = _parse_path(path_sequence, separator)
         else:
-            self._sequence = tuple(path_sequence)
+            self._sequence = path_sequence if type(path_sequence) is tuple else tuple(path_sequence)
+        self._length = len(self._sequence)
+        self._hash = None
+
+    @classmethod
+    def _prefix(cls, path: "MultiListPath", length: int) -> "MultiListPath":
+        result = cls.__new__(cls)
+        result.separator = path.separator
+        result._sequence = path._sequence
+        result._length = length
+        result._hash = None
+        return result
+
+    def _as_tuple(self) -> Tuple[int, ...]:
+        return self._sequence if self._length == len(self._sequence) else self._sequence[:self._length]
+
+    def _items(self) -> Iterator[int]:
+        # iterates a prefix without copying the shared sequence
+        return iter(self._sequence) if self._length == len(self._sequence) else islice(self._sequence, self._length)
 
     def __str__(self):
-        return str.join(self.separator, (str(i) for i in self._sequence))
+        return str.join(self.separator, map(str, self._items()))
 
     def __repr__(self):
         return f"MultiListPath('{str(self)}')"
 
     def __len__(self):
-        return len(self._sequence)
+        return self._length
 
     def __iter__(self):
-        return iter(self._sequence)
+        return self._items()
 
     def __getitem__(self, item) -> Union[int, "MultiListPath"]:
-        result = self._sequence.__getitem__(item)
-        return MultiListPath(result) if isinstance(item, slice) else result
+        if isinstance(item, slice):
+            start, stop, step = item.indices(self._length)
+            if start == 0 and step == 1:
+                return MultiListPath._prefix(self, max(stop, 0))
+            return MultiListPath(self._as_tuple()[item], self.separator)
+        if item < 0:
+            item += self._length
+        if not 0 <= item < self._length:
+            raise IndexError("path index out of range")
+        return self._sequence[item]
 
     def __bool__(self):
-        return bool(self._sequence)
+        return self._length > 0
 
     def __eq__(self, other: "MultiListPath"):
-        return self._sequence == other._sequence
+        if not isinstance(other, MultiListPath):
+            return NotImplemented
+        return self._length == other._length and (
+            self._sequence is other._sequence or all(map(eq, self._items(), other._items()))
+        )
+
+    def __hash__(self):
+        if self._hash is None:
+            # the same for a prefix and a path with equal items, without making a tuple of the prefix
+            result = self._length
+            for index in self._items():
+                result = (result * _PATH_HASH_MULTIPLIER ^ index) & _PATH_HASH_MASK
+            self._hash = hash(result)
+        return self._hash
 
     def startswith(self, other: "MultiListPath"):
-        if len(other) > len(self):
+        if other._length > self._length:
             return False
-        for i, j in zip(self._sequence, other._sequence):
-            if i != j:
-                return False
-        return True
-
-
+        return self._sequence is other._sequence or all(map(eq, islice(self._sequence, other._length), other._items()))
+
+
+class _PathCache(OrderedDict):
+    def __init__(self, max_size: int):
+        super().__init__()
+        self.max_size = max_size
+
+
+def _observed_find_node(self: "MultiList", path: MultiListPath) -> MultiListNode | None:
+    observer = self._observer
+    observer.count("path_length", len(path))
+    if self._path_cache is not None:
+        observer.count("path_cache_lookups")
+        return self._find_node_cached(path)
+    if not path:
+        return None
+    node = self.root
+    hops = 0
+    path_part_index = 0
+    try:
+        for index in path:
+            assert index >= 0
+            for i in range(index):
+                if not node:
+                    return None
+                node = node.right
+                hops += 1
+            if not node:
+                return None
+            path_part_index += 1
+            if path_part_index < len(path):
+                node = node.child.root if node.child else None
+                hops += 1
+                if not node:
+                    return None
+        return node
+    finally:
+        observer.count("pointer_hops", hops)
+
+
+def _observed_find_node_cached(self: "MultiList", path: MultiListPath) -> MultiListNode | None:
+    cache = self._path_cache
+    entry = cache.get(path)
+    if entry is not None:
+        node, branches, versions = entry
+        if all(branch._version == version for branch, version in zip(branches, versions)):
+            cache.move_to_end(path)
+            return node
+    if not path:
+        return None
+    self._observer.count("path_cache_misses")
+    branches = []
+    branch = self
+    node = None
+    hops = 0
+    try:
+        for index in path:
+            assert index >= 0
+            if branch is None:
+                return None
+            if branches:
+                # move from the parent to the root of its branch
+                hops += 1
+            branches.append(branch)
+            node = branch.root
+            for _ in range(index):
+                if not node:
+                    return None
+                node = node.right
+                hops += 1
+            if not node:
+                return None
+            branch = node.child
+    finally:
+        self._observer.count("pointer_hops", hops)
+    cache[path] = (node, branches, [branch._version for branch in branches])
+    if len(cache) > cache.max_size:
+        cache.popitem(last=False)
+    return node
+
+
+def _observed_insert(self: "MultiList", parent_node: MultiListNode, value, position: int) -> MultiListNode:
+    # a new branch is created for the first child
+    allocations = 1 if parent_node.child else 2
+    node = self._observed_class._insert(self, parent_node, value, position)
+    self._observer.count("allocations", allocations)
+    return node
+
+
+@observable(
+    (
+        "append", "delete", "find", "exists", "change_value", "move", "swap", "delete_level", "delete_child",
+        "make_full_copy", "make_shared_copy", "get_items_count", "deepest_level_number", "to_nested", "render",
+        "clear"
+    ),
+    {"_find_node": _observed_find_node, "_find_node_cached": _observed_find_node_cached, "_insert": _observed_insert}
+)
 class MultiList:
-    def __init__(self):
+    __slots__ = ("root", "_items_count", "_owner", "_version", "_path_cache")
+
+    def __init__(self, owner: object | None = None):
         self.root: MultiListNode | None = None
         self._items_count = 0
+        # nodes and branches with another owner may be shared with copies and must not be changed in place
+        self._owner = owner
+        # incremented on every change of this branch's chain or detachment of this branch
+        self._version = 0
+        self._path_cache: _PathCache | None = None
+
+    def set_path_cache_size(self, size: int):
+        """
+        Enables an LRU cache of nodes found by path for up to size paths (0 disables it).
+        A cached node is returned only if no branch on its path has changed since it was found
+        """
+        self._path_cache = _PathCache(size) if size > 0 else None
+
+    @classmethod
+    def from_nested(cls, items: Iterable[Tuple[Any, Iterable | None]]) -> "MultiList":
+        """
+        Builds a multi-list from nested (value, children) pairs, where children is either None
+        or an iterable of such pairs. Items are consumed lazily in pre-order within a single pass,
+        so the source can be a generator that produces one branch at a time
+        """
+        result = cls()
+        stack: List[list] = [[result, None, iter(items), None]]
+        while stack:
+            frame = stack[-1]
+            current_list, owner_node = frame[0], frame[3]
+            for value, children in frame[2]:
+                node = MultiListNode(value)
+                if frame[1]:
+                    frame[1].right = node
+                else:
+                    current_list.root = node
+                frame[1] = node
+                current_list._items_count += 1
+                if children is not None:
+                    node.child = MultiList()
+                    stack.append([node.child, None, iter(children), node])
+                    break
+            else:
+                stack.pop()
+                if owner_node is not None and not current_list._items_count:
+                    owner_node.child = None
+        return result
+
+    def to_nested(self) -> List[Tuple[Any, list | None]]:
+        result = []
+        stack: List[Tuple[list, MultiListNode | None]] = [(result, self.root)]
+        while stack:
+            target, node = stack.pop()
+            while node:
+                children = [] if node.child else None
+                target.append((node.value, children))
+                if node.child:
+                    stack.append((target, node.right))
+                    target, node = children, node.child.root
+                else:
+                    node = node.right
+        return result
 
     def _iterate(self, include_all_levels: bool = True):
         iteration_item = self.root
@@ -67,38 +294,71 @@ class MultiList:
                 yield from iteration_item.child._iterate(True)
             iteration_item = iteration_item.right
 
+    def iterate(self, path: MultiListPath | None = None, include_all_levels: bool = True) -> Iterator[Any]:
+        """
+        Yields values of the whole list (or of the branch under the node at path) in pre-order
+        """
+        branch = self
+        if path:
+            node = self._find_node(path)
+            if not node:
+                raise LookupError("Path does not exist")
+            branch = node.child
+            if branch is None:
+                return
+        for node in branch._iterate(include_all_levels):
+            yield node.value
+
+    @staticmethod
+    def _iterate_branch_values(
+            branch: "MultiList", parent_path: MultiListPath | None, next_branches: list | None,
+            path_separator: str, head: int | None, tail: int | None
+    ):
+        for position, node in truncate(branch._iterate(include_all_levels=False), branch._items_count, head, tail):
+            if position is None:
+                yield None, node
+                continue
+            if next_branches is not None and node.child:
+                next_branches.append((
+                    MultiListPath((*(parent_path or tuple()), position), separator=path_separator), node.child
+                ))
+            yield position, node.value
+
+    def _iterate_levels(
+            self, level: int = 0, path_separator: str = "/", head: int | None = None, tail: int | None = None,
+            max_depth: int | None = None
+    ):
+        branches: List[Tuple[MultiListPath | None, MultiList]] = [(None, self)]
+        depth = 0
+        while branches:
+            next_branches = [] if max_depth is None or depth < max_depth else None
+            yield level + depth, (
+                (parent_path, self._iterate_branch_values(
+                    branch, parent_path, next_branches, path_separator, head, tail
+                ))
+                for parent_path, branch in branches
+            )
+            branches = next_branches
+            depth += 1
+
+    def render(
+            self, stream: TextIO | None = None, output_format: str = "text", level: int = 0,
+            path_separator: str = None, highlight_string_values: bool = False,
+            head: int | None = None, tail: int | None = None, max_depth: int | None = None
+    ):
+        """
+        Writes the multi-list level by level to the stream (stdout by default) as text, JSON lines or Graphviz DOT.
+        Only the first head and the last tail items of every branch are written if any of them is specified,
+        and only levels up to max_depth below the first one
+        """
+        render_tree_levels(
+            self._iterate_levels(level, path_separator or MultiListPath('').separator, head, tail, max_depth),
+            stream or sys.stdout, output_format, "Level {} -", "MultiList",
+            lambda value: format_text_value(value, highlight_string_values)
+        )
+
     def print_all(self, level: int = 0, path_separator: str = None, highlight_string_values: bool = False):
-        if not path_separator:
-            path_separator = MultiListPath('').separator
-        levels_to_print: Deque[Tuple[MultiListPath | None, MultiList, int]] = deque(((None, self, level), ))
-        previous_level = None
-        while levels_to_print:
-            parent_path, current_list, current_level = levels_to_print.popleft()
-            if previous_level != current_level:
-                if previous_level is not None:
-                    print()
-                print(f"Level {current_level} -", end='')
-            print(", " if previous_level == current_level else " ", end='')
-            if parent_path is not None:
-                print(f"{str(parent_path)}:", end='')
-            print("[", end='')
-            first_printed = False
-            index: int | None = 0
-            for item in current_list._iterate(include_all_levels=False):
-                if first_printed:
-                    print(", ", end='')
-                value = item.value
-                print(repr(value) if highlight_string_values and isinstance(value, str) else value, end='')
-                if item.child:
-                    levels_to_print.append((
-                        MultiListPath((*(parent_path or tuple()), index), separator=path_separator),
-                        item.child, current_level + 1
-                    ))
-                first_printed = True
-                index += 1
-            previous_level = current_level
-            print("]", end='')
-        print()
+        self.render(level=level, path_separator=path_separator, highlight_string_values=highlight_string_values)
 
     def deepest_level_number(self, level: int = 0):
         iteration_item = self.root
@@ -110,6 +370,8 @@ class MultiList:
         return max_deep
 
     def _find_node(self, path: MultiListPath) -> MultiListNode | None:
+        if self._path_cache is not None:
+            return self._find_node_cached(path)
         if not path:
             return None
         node = self.root
@@ -129,6 +391,37 @@ class MultiList:
                     return None
         return node
 
+    def _find_node_cached(self, path: MultiListPath) -> MultiListNode | None:
+        cache = self._path_cache
+        entry = cache.get(path)
+        if entry is not None:
+            node, branches, versions = entry
+            if all(branch._version == version for branch, version in zip(branches, versions)):
+                cache.move_to_end(path)
+                return node
+        if not path:
+            return None
+        branches = []
+        branch = self
+        node = None
+        for index in path:
+            assert index >= 0
+            if branch is None:
+                return None
+            branches.append(branch)
+            node = branch.root
+            for _ in range(index):
+                if not node:
+                    return None
+                node = node.right
+            if not node:
+                return None
+            branch = node.child
+        cache[path] = (node, branches, [branch._version for branch in branches])
+        if len(cache) > cache.max_size:
+            cache.popitem(last=False)
+        return node
+
     def exists(self, path: MultiListPath) -> bool:
         return self._find_node(path) is not None
 
@@ -139,6 +432,8 @@ class MultiList:
         return node.value
 
     def change_value(self, new_value, path: MultiListPath):
+        if self._owner is not None and path:
+            self._unshare(path[:-1], path[-1] + 1)
         node = self._find_node(path)
         if not node:
             raise LookupError("Path does not exist")
@@ -146,33 +441,46 @@ class MultiList:
 
     def _append(self, value, path: MultiListPath) -> MultiListNode:
         assert path[-1] >= 0
+        if self._owner is not None:
+            self._unshare(path[:-1], path[-1])
         parent_node = MultiListNode(None, None, self) if len(path) == 1 else self._find_node(path[:-1])
         if parent_node is None:
             raise LookupError("Path does not exist")
+        return self._insert(parent_node, value, path[-1])
+
+    def _new_node(
+            self, value, right: MultiListNode | None = None, child: Optional["MultiList"] = None
+    ) -> MultiListNode:
+        if self._owner is None:
+            return MultiListNode(value, right, child)
+        return _OwnedMultiListNode(value, right, child, self._owner)
+
+    def _insert(self, parent_node: MultiListNode, value, position: int) -> MultiListNode:
         if parent_node.child:
+            parent_node.child._version += 1
             if parent_node.child.root:
-                if parent_node.child._items_count < path[-1]:
+                if parent_node.child._items_count < position:
                     raise LookupError("Path does not exist")
                 node = parent_node.child.root
-                if path[-1] == 0:
-                    result = parent_node.child.root = MultiListNode(value, right=node)
+                if position == 0:
+                    result = parent_node.child.root = self._new_node(value, node)
                 else:
-                    for _ in range(path[-1] - 1):
+                    for _ in range(position - 1):
                         node = node.right
-                    result = node.right = MultiListNode(value, right=node.right)
+                    result = node.right = self._new_node(value, node.right)
                 parent_node.child._items_count += 1
                 return result
             else:
-                if path[-1] != 0:
+                if position != 0:
                     raise LookupError("Path does not exist")
-                parent_node.child.root = MultiListNode(value)
+                parent_node.child.root = self._new_node(value)
                 parent_node.child._items_count = 1
                 return parent_node.child.root
         else:
-            if path[-1] != 0:
+            if position != 0:
                 raise LookupError("Path does not exist")
-            parent_node.child = MultiList()
-            parent_node.child.root = MultiListNode(value)
+            parent_node.child = MultiList(self._owner)
+            parent_node.child.root = self._new_node(value)
             parent_node.child._items_count = 1
             return parent_node.child.root
 
@@ -181,15 +489,23 @@ class MultiList:
 
     def _delete(self, path: MultiListPath) -> MultiListNode:
         assert path[-1] >= 0
+        if self._owner is not None:
+            self._unshare(path[:-1], path[-1])
         parent_node = MultiListNode(None, None, self) if len(path) == 1 else self._find_node(path[:-1])
-        if parent_node is None or parent_node.child is None or parent_node.child._items_count <= path[-1]:
+        if parent_node is None:
             raise LookupError("Path does not exist")
-        if path[-1] == 0:
+        return self._remove(parent_node, path[-1])
+
+    def _remove(self, parent_node: MultiListNode, position: int) -> MultiListNode:
+        if parent_node.child is None or parent_node.child._items_count <= position:
+            raise LookupError("Path does not exist")
+        parent_node.child._version += 1
+        if position == 0:
             result = parent_node.child.root
             parent_node.child.root = parent_node.child.root.right
         else:
             node = parent_node.child.root
-            for _ in range(path[-1] - 1):
+            for _ in range(position - 1):
                 node = node.right
             result = node.right
             node.right = node.right.right
@@ -224,7 +540,7 @@ class MultiList:
         source_node = self._find_node(source_path)
         if not source_node:
             raise LookupError("Source path does not exist")
-        self.delete(source_path)
+        self._delete(source_path)
         try:
             result_node = self._append(source_node.value, destination_path)
             result_node.child = source_node.child
@@ -236,12 +552,18 @@ class MultiList:
     def swap(self, path1: MultiListPath, path2: MultiListPath):
         if path1.startswith(path2) or path2.startswith(path1):
             raise ValueError("Such move would create a loop")
+        if self._owner is not None:
+            self._unshare(path1[:-1], path1[-1] + 1)
+            self._unshare(path2[:-1], path2[-1] + 1)
         node1 = self._find_node(path1)
         if not node1:
             raise LookupError("path1 does not exist")
         node2 = self._find_node(path2)
         if not node2:
             raise LookupError("path2 does not exist")
+        for node in (node1, node2):
+            if node.child:
+                node.child._version += 1
         node1.child, node2.child, node1.value, node2.value = node2.child, node1.child, node2.value, node1.value
 
     def delete_level(self, level_number: int):
@@ -249,12 +571,15 @@ class MultiList:
             raise ValueError("Level must be more than 0")
         elif level_number == 0:
             return self.clear()
+        if self._owner is not None:
+            self._writable_prefix(self, self._items_count)
         for i in self._iterate(include_all_levels=False):
             if i.child is not None:
                 if level_number == 1:
+                    i.child._version += 1
                     i.child = None
                 else:
-                    i.child.delete_level(level_number - 1)
+                    self._writable_branch(i).delete_level(level_number - 1)
 
     def make_full_copy(self) -> "MultiList":
         result = MultiList()
@@ -270,12 +595,63 @@ class MultiList:
         return result
 
     def delete_child(self, path: MultiListPath):
+        if self._owner is not None and path:
+            self._unshare(path[:-1], path[-1] + 1)
         node = self._find_node(path)
         if not node:
             raise LookupError("Path does not exist")
         if not node.child:
             raise LookupError("Node at this path has no child")
+        node.child._version += 1
         node.child = None
 
+    def make_shared_copy(self) -> "MultiList":
+        """
+        Makes a copy in O(1) which shares all nodes with this list (copy-on-write).
+        After that, both lists copy only the nodes and branches on the path to every changed node.
+        Indexed and ordered multi-lists make a full copy instead
+        """
+        result = MultiList(object())
+        result.root = self.root
+        result._items_count = self._items_count
+        self._owner = object()
+        return result
+
+    def _writable_prefix(self, branch: "MultiList", count: int) -> MultiListNode | None:
+        previous, node = None, branch.root
+        for _ in range(count):
+            if not node:
+                return None
+            if getattr(node, "owner", None) is not self._owner:
+                node = self._new_node(node.value, node.right, node.child)
+                branch._version += 1
+                if previous:
+                    previous.right = node
+                else:
+                    branch.root = node
+            previous, node = node, node.right
+        return previous
+
+    def _writable_branch(self, node: MultiListNode) -> "MultiList":
+        if node.child._owner is not self._owner:
+            branch = MultiList(self._owner)
+            branch.root = node.child.root
+            branch._items_count = node.child._items_count
+            node.child._version += 1
+            node.child = branch
+        return node.child
+
+    def _unshare(self, parent_path: MultiListPath, count: int):
+        branch = self
+        for index in parent_path:
+            node = self._writable_prefix(branch, index + 1)
+            if not node or not node.child:
+                return
+            branch = self._writable_branch(node)
+        self._writable_prefix(branch, count)
+
     def clear(self):
+        path_cache = self._path_cache
         self.__init__()
+        if path_cache is not None:
+            self.set_path_cache_size(path_cache.max_size)
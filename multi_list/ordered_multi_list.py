@@ -0,0 +1,360 @@
+from random import random
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from multi_list import MultiList, MultiListNode, MultiListPath
+from utils.profiling import observable
+
+
+MAX_INDEX_LEVELS = 32
+ORDER_ERROR = "Value breaks the order of the branch"
+
+
+class _IndexTower:
+    __slots__ = ("node", "right", "width")
+
+    def __init__(self, node: MultiListNode | None, levels: int):
+        self.node = node
+        self.right: List[_IndexTower | None] = [None] * levels
+        # count of positions from this tower to the next one on every level
+        self.width: List[int] = [1] * levels
+
+
+class _BranchIndex:
+    """
+    Indexable skip-list of the nodes of a branch in their order, where every link knows how many positions
+    it skips, so a node is found by its position or (in a sorted branch) by its value in O(log k)
+    """
+    __slots__ = ("head", "size")
+
+    def __init__(self):
+        self.head = _IndexTower(None, 1)
+        self.size = 0
+
+    def _predecessors(self, position: int) -> Tuple[List[_IndexTower], List[int]]:
+        """
+        Returns the last tower before position on every level and count of positions passed on every level
+        """
+        levels = len(self.head.right)
+        chain: List[_IndexTower | None] = [None] * levels
+        steps = [0] * levels
+        tower = self.head
+        for level in range(levels - 1, -1, -1):
+            while tower.right[level] is not None and tower.width[level] <= position:
+                position -= tower.width[level]
+                steps[level] += tower.width[level]
+                tower = tower.right[level]
+            chain[level] = tower
+        return chain, steps
+
+    def insert(self, position: int, node: MultiListNode):
+        levels = 1
+        while levels < MAX_INDEX_LEVELS and random() < 0.5:
+            levels += 1
+        while len(self.head.right) < levels:
+            self.head.right.append(None)
+            self.head.width.append(self.size + 1)
+        chain, steps = self._predecessors(position)
+        tower = _IndexTower(node, levels)
+        passed = 0
+        for level in range(levels):
+            previous = chain[level]
+            tower.right[level] = previous.right[level]
+            previous.right[level] = tower
+            tower.width[level] = previous.width[level] - passed
+            previous.width[level] = passed + 1
+            passed += steps[level]
+        for level in range(levels, len(chain)):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, position: int) -> MultiListNode:
+        chain, _ = self._predecessors(position)
+        tower = chain[0].right[0]
+        for level in range(len(tower.right)):
+            previous = chain[level]
+            previous.width[level] += tower.width[level] - 1
+            previous.right[level] = tower.right[level]
+        for level in range(len(tower.right), len(chain)):
+            chain[level].width[level] -= 1
+        self.size -= 1
+        return tower.node
+
+    def node_at(self, position: int) -> MultiListNode:
+        position += 1
+        tower = self.head
+        for level in range(len(self.head.right) - 1, -1, -1):
+            while tower.right[level] is not None and tower.width[level] <= position:
+                position -= tower.width[level]
+                tower = tower.right[level]
+        return tower.node
+
+    def _observed_node_at(self, position: int) -> Tuple[MultiListNode, int]:
+        """
+        node_at, which also returns count of the pointer hops made (for profiling)
+        """
+        position += 1
+        tower = self.head
+        hops = len(self.head.right)
+        for level in range(len(self.head.right) - 1, -1, -1):
+            while tower.right[level] is not None and tower.width[level] <= position:
+                position -= tower.width[level]
+                tower = tower.right[level]
+                hops += 1
+        return tower.node, hops
+
+    def bisect(self, value, right: bool = False) -> int:
+        """
+        Returns count of the nodes with values less than (or not greater than, if right) the value
+        """
+        position = 0
+        tower = self.head
+        for level in range(len(self.head.right) - 1, -1, -1):
+            while tower.right[level] is not None and (
+                    not value < tower.right[level].node.value if right else tower.right[level].node.value < value
+            ):
+                position += tower.width[level]
+                tower = tower.right[level]
+        return position
+
+
+def _observed_find_node(self: "OrderedMultiList", path: MultiListPath) -> MultiListNode | None:
+    observer = self._observer
+    observer.count("path_length", len(path))
+    if not path:
+        return None
+    branch, node = self, None
+    hops = 0
+    try:
+        for position in path:
+            assert position >= 0
+            if branch is None or position >= branch._items_count:
+                return None
+            node, index_hops = self._indexes[branch]._observed_node_at(position)
+            hops += index_hops
+            branch = node.child
+        return node
+    finally:
+        observer.count("pointer_hops", hops)
+
+
+def _observed_insert(self: "OrderedMultiList", parent_node: MultiListNode, value, position: int) -> MultiListNode:
+    # the node and its index tower, a new branch also gets its index
+    allocations = 2 if parent_node.child else 4
+    node = self._observed_class._insert(self, parent_node, value, position)
+    self._observer.count("allocations", allocations)
+    return node
+
+
+@observable(
+    (
+        "append", "delete", "find", "exists", "change_value", "move", "swap", "delete_level", "delete_child",
+        "make_full_copy", "make_shared_copy", "get_items_count", "deepest_level_number", "to_nested", "render",
+        "clear", "insert_sorted", "find_by_value", "iterate_range"
+    ),
+    {"_find_node": _observed_find_node, "_insert": _observed_insert}
+)
+class OrderedMultiList(MultiList):
+    """
+    Multi-list, which keeps the items of every branch (and of the level 0) sorted by value.
+    Every branch has an indexable skip-list of its nodes, so finding a node by path, looking up a value
+    in a branch and inserting a value to its sorted place take O(log k) per level for branches of k items.
+    Positional changes (append, move, swap, change_value) are still available, but fail with ValueError
+    if they would break the order. Values of a branch must be comparable with each other.
+    The indexes replace the path cache, so it cannot be enabled
+    """
+    __slots__ = ("_indexes", )
+
+    def __init__(self):
+        super().__init__()
+        self._indexes: Dict[MultiList, _BranchIndex] = {self: _BranchIndex()}
+
+    @classmethod
+    def from_nested(cls, items: Iterable[Tuple[Any, Iterable | None]]) -> "OrderedMultiList":
+        result = super().from_nested(items)
+        result._index_branch(result)
+        return result
+
+    def _index_branch(self, branch: MultiList):
+        stack = [branch]
+        while stack:
+            current = stack.pop()
+            index = self._indexes[current] = _BranchIndex()
+            previous = None
+            for position, node in enumerate(current._iterate(include_all_levels=False)):
+                if previous is not None and node.value < previous.value:
+                    raise ValueError(ORDER_ERROR)
+                index.insert(position, node)
+                previous = node
+                if node.child:
+                    stack.append(node.child)
+
+    def _drop_indexes(self, branch: MultiList):
+        self._indexes.pop(branch, None)
+        for node in branch._iterate(include_all_levels=True):
+            if node.child:
+                self._indexes.pop(node.child, None)
+
+    def set_path_cache_size(self, size: int):
+        if size > 0:
+            raise ValueError("Path cache is not supported by ordered multi-list, its indexes find nodes instead")
+
+    def _parent_node(self, path: MultiListPath | None) -> MultiListNode:
+        parent_node = self._find_node(path) if path else MultiListNode(None, None, self)
+        if parent_node is None:
+            raise LookupError("Path does not exist")
+        return parent_node
+
+    def _fits(self, path: MultiListPath, node: MultiListNode, value) -> bool:
+        branch = self if len(path) == 1 else self._find_node(path[:-1]).child
+        previous = self._indexes[branch].node_at(path[-1] - 1) if path[-1] else None
+        return (previous is None or not value < previous.value) and (node.right is None or not node.right.value < value)
+
+    def _find_node(self, path: MultiListPath) -> MultiListNode | None:
+        if not path:
+            return None
+        branch, node = self, None
+        for position in path:
+            assert position >= 0
+            if branch is None or position >= branch._items_count:
+                return None
+            node = self._indexes[branch].node_at(position)
+            branch = node.child
+        return node
+
+    def _insert(self, parent_node: MultiListNode, value, position: int) -> MultiListNode:
+        branch = parent_node.child
+        if branch is None or branch.root is None:
+            node = super()._insert(parent_node, value, position)
+            self._indexes.setdefault(parent_node.child, _BranchIndex()).insert(0, node)
+            return node
+        if branch._items_count < position:
+            raise LookupError("Path does not exist")
+        index = self._indexes[branch]
+        previous = index.node_at(position - 1) if position else None
+        following = previous.right if previous else branch.root
+        if (previous is not None and value < previous.value) or (following is not None and following.value < value):
+            raise ValueError(ORDER_ERROR)
+        branch._version += 1
+        node = self._new_node(value, following)
+        if previous is None:
+            branch.root = node
+        else:
+            previous.right = node
+        branch._items_count += 1
+        index.insert(position, node)
+        return node
+
+    def _remove(self, parent_node: MultiListNode, position: int) -> MultiListNode:
+        branch = parent_node.child
+        if branch is None or branch._items_count <= position:
+            raise LookupError("Path does not exist")
+        index = self._indexes[branch]
+        node = index.remove(position)
+        branch._version += 1
+        previous = index.node_at(position - 1) if position else None
+        if previous is None:
+            branch.root = node.right
+        else:
+            previous.right = node.right
+        branch._items_count -= 1
+        if branch._items_count == 0:
+            parent_node.child = None
+            if branch is not self:
+                del self._indexes[branch]
+        return node
+
+    def insert_sorted(self, value, path: MultiListPath | None = None) -> MultiListPath:
+        """
+        Inserts the value into the branch of the node at path (or into the level 0) after all items,
+        which are not greater than it. Returns the path of the new item
+        """
+        parent_node = self._parent_node(path)
+        position = self._indexes[parent_node.child].bisect(value, right=True) if parent_node.child else 0
+        self._insert(parent_node, value, position)
+        return MultiListPath((*(path or ()), position))
+
+    def find_by_value(self, value, path: MultiListPath | None = None) -> MultiListPath | None:
+        """
+        Returns the path of the first item with the value in the branch of the node at path (or in the level 0)
+        """
+        branch = self._parent_node(path).child
+        if branch is None:
+            return None
+        index = self._indexes[branch]
+        position = index.bisect(value)
+        if position < branch._items_count and index.node_at(position).value == value:
+            return MultiListPath((*(path or ()), position))
+        return None
+
+    def iterate_range(self, start=None, stop=None, path: MultiListPath | None = None) -> Iterator[Any]:
+        """
+        Yields values of the branch of the node at path (or of the level 0) from start (inclusive)
+        to stop (exclusive) in order. If start or stop is None, the range is not limited from that side
+        """
+        branch = self._parent_node(path).child
+        if branch is None:
+            return
+        index = self._indexes[branch]
+        position = index.bisect(start) if start is not None else 0
+        node = index.node_at(position) if position < branch._items_count else None
+        while node and (stop is None or node.value < stop):
+            yield node.value
+            node = node.right
+
+    def delete(self, path: MultiListPath):
+        node = self._delete(path)
+        if node.child:
+            self._drop_indexes(node.child)
+
+    def change_value(self, new_value, path: MultiListPath):
+        node = self._find_node(path)
+        if not node:
+            raise LookupError("Path does not exist")
+        if not self._fits(path, node, new_value):
+            raise ValueError(ORDER_ERROR)
+        node.value = new_value
+
+    def move(self, source_path: MultiListPath, destination_path: MultiListPath):
+        # the source node is already removed when the destination turns out to break the order
+        source_node = self._find_node(source_path)
+        try:
+            super().move(source_path, destination_path)
+        except ValueError as err:
+            if err.args[0] != ORDER_ERROR:
+                raise
+            result_node = self._append(source_node.value, source_path)
+            result_node.child = source_node.child
+            raise
+
+    def swap(self, path1: MultiListPath, path2: MultiListPath):
+        super().swap(path1, path2)
+        node1, node2 = self._find_node(path1), self._find_node(path2)
+        if not (self._fits(path1, node1, node1.value) and self._fits(path2, node2, node2.value)):
+            super().swap(path1, path2)
+            raise ValueError(ORDER_ERROR)
+
+    def delete_level(self, level_number: int):
+        if level_number <= 0:
+            return super().delete_level(level_number)
+        branches = [self]
+        for _ in range(level_number):
+            branches = [node.child for branch in branches for node in branch._iterate(False) if node.child]
+        for branch in branches:
+            self._drop_indexes(branch)
+        super().delete_level(level_number)
+
+    def delete_child(self, path: MultiListPath):
+        node = self._find_node(path)
+        branch = node.child if node else None
+        super().delete_child(path)
+        self._drop_indexes(branch)
+
+    def make_full_copy(self) -> "OrderedMultiList":
+        return OrderedMultiList.from_nested(self.to_nested())
+
+    def make_shared_copy(self) -> "OrderedMultiList":
+        """
+        Makes a full copy in O(n) with its own indexes.
+        Nodes of this list are referenced by the indexes, so they cannot be shared and replaced by copy-on-write
+        """
+        return self.make_full_copy()
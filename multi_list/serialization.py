@@ -0,0 +1,355 @@
+import json
+import pickle
+import struct
+import sys
+from array import array
+from typing import TextIO, BinaryIO, Iterator, Tuple, Any, List
+
+from multi_list import MultiList, MultiListNode
+
+
+JSON_READ_CHUNK_SIZE = 65536
+# characters which may continue a number decoded from the end of a chunk
+JSON_NUMBER_CONTINUATION = frozenset("0123456789.eE+-")
+
+BINARY_MAGIC = b"MLST"
+BINARY_VERSION = 1
+# magic, version, flags, nodes count, top-level items count, size of the values section
+BINARY_HEADER = struct.Struct("<4sHHQQQ")
+BINARY_INDEX_TYPECODE = "q"
+BINARY_INDEX_SIZE = array(BINARY_INDEX_TYPECODE).itemsize
+BINARY_NO_INDEX = -1
+
+_INT64_MIN, _INT64_MAX = -(2 ** 63), 2 ** 63 - 1
+_INT64 = struct.Struct("<q")
+_FLOAT64 = struct.Struct("<d")
+
+
+class _JsonStreamReader:
+    def __init__(self, stream: TextIO, chunk_size: int = JSON_READ_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _read_more(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer) or not self._read_more():
+                return
+
+    def consume(self, token: str) -> bool:
+        self._skip_whitespace()
+        while len(self.buffer) - self.position < len(token) and self._read_more():
+            pass
+        if self.buffer.startswith(token, self.position):
+            self.position += len(token)
+            return True
+        return False
+
+    def expect(self, token: str):
+        if not self.consume(token):
+            raise ValueError(f"Invalid JSON: expected '{token}' at position {self.position}")
+
+    def read_value(self) -> Any:
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._read_more():
+                    continue
+                raise
+            # a number cut by the end of the buffer (even right after "." or "e") may continue in the next chunk
+            if (
+                    isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and (end == len(self.buffer) or self.buffer[end] in JSON_NUMBER_CONTINUATION)
+                    and self._read_more()
+            ):
+                continue
+            self.position = end
+            return value
+
+    def ensure_finished(self):
+        self._skip_whitespace()
+        if self.position < len(self.buffer):
+            raise ValueError(f"Invalid JSON: extra data at position {self.position}")
+
+
+def _skip_items(items: Iterator[Tuple[Any, Iterator | None]]):
+    for _, children in items:
+        if children is not None:
+            _skip_items(children)
+
+
+def _iterate_json_items(reader: _JsonStreamReader) -> Iterator[Tuple[Any, Iterator | None]]:
+    reader.expect("[")
+    if reader.consume("]"):
+        return
+    while True:
+        reader.expect("[")
+        value = reader.read_value()
+        reader.expect(",")
+        children = None if reader.consume("null") else _iterate_json_items(reader)
+        yield value, children
+        if children is not None:
+            _skip_items(children)
+        reader.expect("]")
+        if reader.consume("]"):
+            return
+        reader.expect(",")
+
+
+def iterate_json(stream: TextIO, chunk_size: int = JSON_READ_CHUNK_SIZE) -> Iterator[Tuple[Any, Iterator | None]]:
+    """
+    Lazily parses a nested JSON document in the format of MultiList.to_nested()
+    ([[value, [children...] | null], ...]), reading the stream by chunk_size characters.
+    Children of every item must be consumed before the next item
+    """
+    reader = _JsonStreamReader(stream, chunk_size)
+    yield from _iterate_json_items(reader)
+    reader.ensure_finished()
+
+
+def load_json(stream: TextIO, chunk_size: int = JSON_READ_CHUNK_SIZE) -> MultiList:
+    return MultiList.from_nested(iterate_json(stream, chunk_size))
+
+
+def dump_json(lst: MultiList, stream: TextIO):
+    write = stream.write
+    write("[")
+    stack: List[MultiListNode | None] = []
+    node, first = lst.root, True
+    while True:
+        if node:
+            write(("[" if first else ", [") + json.dumps(node.value) + ", ")
+            if node.child:
+                write("[")
+                stack.append(node.right)
+                node, first = node.child.root, True
+            else:
+                write("null]")
+                node, first = node.right, False
+        elif stack:
+            write("]]")
+            node, first = stack.pop(), False
+        else:
+            break
+    write("]")
+
+
+def load_ndjson(stream: TextIO) -> MultiList:
+    """
+    Loads a multi-list from lines of [depth, value] pairs written in pre-order
+    """
+    result = MultiList()
+    lists: List[MultiList] = [result]
+    tails: List[MultiListNode | None] = [None]
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        depth, value = json.loads(line)
+        if (
+                not isinstance(depth, int) or isinstance(depth, bool) or depth < 0 or depth > len(lists)
+                or (depth == len(lists) and not tails[-1])
+        ):
+            raise ValueError(f"Invalid depth on line {line_number}")
+        if depth == len(lists):
+            tails[-1].child = MultiList()
+            lists.append(tails[-1].child)
+            tails.append(None)
+        elif depth < len(lists) - 1:
+            del lists[depth + 1:], tails[depth + 1:]
+        node = MultiListNode(value)
+        if tails[depth]:
+            tails[depth].right = node
+        else:
+            lists[depth].root = node
+        tails[depth] = node
+        lists[depth]._items_count += 1
+    return result
+
+
+def dump_ndjson(lst: MultiList, stream: TextIO):
+    write = stream.write
+    stack: List[Tuple[MultiListNode | None, int]] = []
+    node, depth = lst.root, 0
+    while node or stack:
+        if not node:
+            node, depth = stack.pop()
+            continue
+        write(json.dumps([depth, node.value]) + "\n")
+        if node.child:
+            stack.append((node.right, depth))
+            node, depth = node.child.root, depth + 1
+        else:
+            node = node.right
+
+
+def encode_value(value, allow_pickle: bool = False) -> bytes:
+    if value is None:
+        return b"N"
+    if value is True:
+        return b"T"
+    if value is False:
+        return b"F"
+    if type(value) is int:
+        if _INT64_MIN <= value <= _INT64_MAX:
+            return b"i" + _INT64.pack(value)
+        return b"I" + str(value).encode()
+    if type(value) is float:
+        return b"f" + _FLOAT64.pack(value)
+    if type(value) is str:
+        return b"s" + value.encode()
+    if type(value) is bytes:
+        return b"b" + value
+    if not allow_pickle:
+        raise TypeError(f"Values of type {type(value).__name__} cannot be stored without allow_pickle")
+    return b"p" + pickle.dumps(value)
+
+
+def decode_value(data: bytes | memoryview, allow_pickle: bool = False):
+    tag = chr(data[0])
+    if tag == "N":
+        return None
+    if tag == "T":
+        return True
+    if tag == "F":
+        return False
+    if tag == "i":
+        return _INT64.unpack_from(data, 1)[0]
+    if tag == "I":
+        return int(bytes(data[1:]))
+    if tag == "f":
+        return _FLOAT64.unpack_from(data, 1)[0]
+    if tag == "s":
+        return str(data[1:], "utf-8")
+    if tag == "b":
+        return bytes(data[1:])
+    if tag == "p":
+        # unpickling can run arbitrary code, so only trusted files may be loaded with allow_pickle
+        if not allow_pickle:
+            raise ValueError("Binary multi-list has pickled values, they are loaded only with allow_pickle")
+        return pickle.loads(data[1:])
+    raise ValueError(f"Unknown value tag {tag}")
+
+
+def _index_array_to_bytes(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def index_array_from_bytes(data: bytes | memoryview) -> array:
+    result = array(BINARY_INDEX_TYPECODE)
+    result.frombytes(data)
+    if sys.byteorder != "little":
+        result.byteswap()
+    return result
+
+
+def dump_binary(lst: MultiList, stream: BinaryIO, allow_pickle: bool = False):
+    """
+    Writes a multi-list as pre-order index arrays (first child, next sibling, branch size, value offset)
+    followed by the encoded values, so it can be restored in one pass or read through MappedMultiList.
+    Values other than None, bool, int, float, str and bytes raise TypeError, unless allow_pickle
+    lets them be pickled (such files must be loaded with allow_pickle too)
+    """
+    first_child, next_sibling, child_count = array(BINARY_INDEX_TYPECODE), array(BINARY_INDEX_TYPECODE), \
+        array(BINARY_INDEX_TYPECODE)
+    value_offsets = array(BINARY_INDEX_TYPECODE, (0, ))
+    values = bytearray()
+    stack: List[Tuple[MultiListNode | None, int]] = []
+    node, previous_index = lst.root, BINARY_NO_INDEX
+    while node or stack:
+        if not node:
+            node, previous_index = stack.pop()
+            continue
+        index = len(first_child)
+        if previous_index != BINARY_NO_INDEX:
+            next_sibling[previous_index] = index
+        values += encode_value(node.value, allow_pickle)
+        value_offsets.append(len(values))
+        next_sibling.append(BINARY_NO_INDEX)
+        if node.child and node.child.root:
+            first_child.append(index + 1)
+            child_count.append(node.child._items_count)
+            stack.append((node.right, index))
+            node, previous_index = node.child.root, BINARY_NO_INDEX
+        else:
+            first_child.append(BINARY_NO_INDEX)
+            child_count.append(0)
+            node, previous_index = node.right, index
+    stream.write(BINARY_HEADER.pack(
+        BINARY_MAGIC, BINARY_VERSION, 0, len(first_child), lst._items_count if lst.root else 0, len(values)
+    ))
+    for index_array in (first_child, next_sibling, child_count, value_offsets):
+        stream.write(_index_array_to_bytes(index_array))
+    stream.write(values)
+
+
+def read_binary_header(data: bytes | memoryview) -> Tuple[int, int, int]:
+    if len(data) < BINARY_HEADER.size:
+        raise ValueError("Invalid binary multi-list: header is truncated")
+    magic, version, _, nodes_count, items_count, values_size = BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC:
+        raise ValueError("Invalid binary multi-list: wrong magic")
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported binary multi-list version {version}")
+    return nodes_count, items_count, values_size
+
+
+def binary_index_lengths(nodes_count: int) -> Tuple[int, int, int, int]:
+    """
+    Lengths of the index arrays (first child, next sibling, branch size, value offset) for count of nodes
+    """
+    return nodes_count, nodes_count, nodes_count, nodes_count + 1
+
+
+def load_binary(stream: BinaryIO, allow_pickle: bool = False) -> MultiList:
+    """
+    Restores a multi-list written by dump_binary. Pickled values are loaded only with allow_pickle,
+    which must not be used for untrusted files
+    """
+    nodes_count, items_count, values_size = read_binary_header(stream.read(BINARY_HEADER.size))
+    index_arrays = []
+    for length in binary_index_lengths(nodes_count):
+        data = stream.read(length * BINARY_INDEX_SIZE)
+        if len(data) != length * BINARY_INDEX_SIZE:
+            raise ValueError("Invalid binary multi-list: index is truncated")
+        index_arrays.append(index_array_from_bytes(data))
+    first_child, next_sibling, child_count, value_offsets = index_arrays
+    values = memoryview(stream.read(values_size))
+    if len(values) != values_size:
+        raise ValueError("Invalid binary multi-list: data is truncated")
+    nodes = [
+        MultiListNode(decode_value(values[value_offsets[i]:value_offsets[i + 1]], allow_pickle))
+        for i in range(nodes_count)
+    ]
+    for i, node in enumerate(nodes):
+        if next_sibling[i] != BINARY_NO_INDEX:
+            node.right = nodes[next_sibling[i]]
+        if first_child[i] != BINARY_NO_INDEX:
+            node.child = MultiList()
+            node.child.root = nodes[first_child[i]]
+            node.child._items_count = child_count[i]
+    result = MultiList()
+    if nodes:
+        result.root = nodes[0]
+        result._items_count = items_count
+    return result
@@ -0,0 +1,26 @@
+from itertools import product
+
+from multi_list import MultiListPath
+
+
+def test_prefixes_equal_paths_with_the_same_items():
+    path = MultiListPath((3, 1, 4, 1, 5))
+    for length in range(6):
+        prefix = path[:length]
+        same = MultiListPath(tuple((3, 1, 4, 1, 5)[:length]))
+        assert prefix == same and hash(prefix) == hash(same)
+        assert list(prefix) == list(same) and str(prefix) == str(same)
+        assert path.startswith(prefix) and path.startswith(same)
+    assert path[:2] != MultiListPath((3, 2)) and not path.startswith(MultiListPath((3, 2)))
+
+
+def test_prefixes_do_not_copy_the_sequence():
+    path = MultiListPath((1, 2, 3))
+    prefix = path[:-1]
+    assert prefix._sequence is path._sequence
+    assert list(prefix) == [1, 2] and prefix[-1] == 2
+
+
+def test_hashes_of_short_paths_differ():
+    paths = [MultiListPath(items) for length in range(4) for items in product(range(4), repeat=length)]
+    assert len({hash(path) for path in paths}) == len(paths)
@@ -0,0 +1,80 @@
+from random import Random
+
+import pytest
+
+from multi_list import MultiList, MultiListPath
+from flat_multi_list import FlatMultiList
+from utils.profiling import Observer, attach_observer
+
+
+def random_nested(rng: Random, count: int, depth: int = 3) -> list:
+    values = iter(rng.sample(range(count * 10), count))
+    result = []
+    branches = [(result, 0)]
+    for value in values:
+        branch, level = rng.choice(branches)
+        children = [] if level < depth and rng.random() < 0.3 else None
+        branch.append((value, children))
+        if children is not None:
+            branches.append((children, level + 1))
+    return result
+
+
+def random_path(rng: Random) -> MultiListPath:
+    return MultiListPath(tuple(rng.randint(0, 4) for _ in range(rng.randint(1, 4))))
+
+
+def value_at(lst, path: MultiListPath):
+    return lst.find(path) if lst.exists(path) else None
+
+
+# the instrumented lookups are copies of the real ones, so they must find exactly the same nodes
+@pytest.mark.parametrize("cls", (MultiList, FlatMultiList))
+@pytest.mark.parametrize("seed", range(20))
+def test_observed_lookups_match_real_ones(cls, seed):
+    rng = Random(seed)
+    nested = random_nested(rng, 60)
+    plain, observed = cls.from_nested(nested), cls.from_nested(nested)
+    attach_observer(observed, Observer())
+    for _ in range(200):
+        path = random_path(rng)
+        assert value_at(observed, path) == value_at(plain, path)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_observed_cached_lookups_match_real_ones(seed):
+    rng = Random(seed)
+    nested = random_nested(rng, 60)
+    plain, observed = MultiList.from_nested(nested), MultiList.from_nested(nested)
+    plain.set_path_cache_size(8)
+    observed.set_path_cache_size(8)
+    attach_observer(observed, Observer())
+    for step in range(300):
+        path = random_path(rng)
+        # both lists must make the same lookups to keep the same caches
+        if step % 10 == 0 and all([lst.exists(path) for lst in (plain, observed)]):
+            for lst in (plain, observed):
+                lst.append(step, path)
+        assert value_at(observed, path) == value_at(plain, path)
+        assert list(observed._path_cache) == list(plain._path_cache)
+
+
+@pytest.mark.parametrize("cls", (MultiList, FlatMultiList))
+def test_pointer_hops(cls):
+    lst = cls.from_nested([(1, [(2, None), (3, [(4, None)])]), (5, None)])
+    observer = Observer()
+    attach_observer(lst, observer)
+    lst.find(MultiListPath((0, 1, 0)))
+    # the flat storage also moves from its virtual root to the level 0
+    assert observer.stats["find"]["pointer_hops"] == (3 if cls is MultiList else 4)
+
+
+def test_pointer_hops_with_path_cache():
+    lst = MultiList.from_nested([(1, [(2, None), (3, [(4, None)])]), (5, None)])
+    lst.set_path_cache_size(4)
+    observer = Observer()
+    attach_observer(lst, observer)
+    for _ in range(2):
+        lst.find(MultiListPath((0, 1, 0)))
+    stats = observer.stats["find"]
+    assert (stats["pointer_hops"], stats["path_cache_lookups"], stats["path_cache_misses"]) == (3, 2, 1)
@@ -0,0 +1,68 @@
+from random import Random
+
+import pytest
+
+from multi_list import MultiList, MultiListNode, MultiListPath
+from baselines import NestedLists
+from indexed_multi_list import IndexedMultiList
+
+
+def random_change(rng: Random, lst, reference: NestedLists):
+    paths = [MultiListPath((0, ))]
+    stack = [((), reference._items)]
+    while stack:
+        prefix, branch = stack.pop()
+        for position, (_, children) in enumerate(branch):
+            paths.append(MultiListPath((*prefix, position)))
+            paths.append(MultiListPath((*prefix, position, 0)))
+            if children:
+                stack.append(((*prefix, position), children))
+    path = rng.choice(paths)
+    operation = rng.choice(("append", "append", "delete", "change_value"))
+    if operation == "append" and not reference.exists(path[:-1]) and len(path) > 1:
+        return
+    if operation != "append" and not reference.exists(path):
+        return
+    arguments = (path, ) if operation == "delete" else (rng.randrange(1000), path)
+    for target in (lst, reference):
+        getattr(target, operation)(*arguments)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_shared_copies_are_independent(seed):
+    rng = Random(seed)
+    lists = [(MultiList(), NestedLists())]
+    for step in range(400):
+        lst, reference = rng.choice(lists)
+        if step % 25 == 0:
+            copy = lst.make_shared_copy()
+            copy_reference = NestedLists()
+            copy_reference._items = _deep_copy(reference._items)
+            lists.append((copy, copy_reference))
+        random_change(rng, lst, reference)
+    for lst, reference in lists:
+        assert list(lst.iterate()) == list(reference.iterate())
+
+
+def _deep_copy(items):
+    return [[value, _deep_copy(children) if children else None] for value, children in items]
+
+
+def test_unshared_nodes_have_no_owner():
+    lst = MultiList()
+    lst.append(1, MultiListPath((0, )))
+    assert type(lst.root) is MultiListNode and not hasattr(lst.root, "owner")
+    copy = lst.make_shared_copy()
+    copy.append(2, MultiListPath((0, 0)))
+    assert copy.root is not lst.root and copy.root.owner is not None
+    assert lst.to_nested() == [(1, None)] and copy.to_nested() == [(1, [(2, None)])]
+
+
+def test_indexed_copies_keep_their_index():
+    lst = IndexedMultiList.from_nested([(1, [(2, None), (1, None)]), (3, None)])
+    for copy in (lst.make_full_copy(), lst.make_shared_copy()):
+        assert type(copy) is IndexedMultiList
+        assert copy.to_nested() == lst.to_nested()
+        copy.change_value(4, MultiListPath((0, 1)))
+        assert copy.find_paths(1) == [MultiListPath((0, ))] and copy.find_paths(4) == [MultiListPath((0, 1))]
+        assert set(lst.find_paths(1)) == {MultiListPath((0, )), MultiListPath((0, 1))}
@@ -0,0 +1,70 @@
+from bisect import bisect_left, bisect_right
+from random import Random
+
+import pytest
+
+from multi_list import MultiListPath
+from ordered_multi_list import OrderedMultiList
+from utils.profiling import Observer, attach_observer
+
+
+def build(rng: Random, count: int) -> OrderedMultiList:
+    lst = OrderedMultiList()
+    for _ in range(count):
+        parent = MultiListPath(tuple(rng.randint(0, 5) for _ in range(rng.randint(0, 2))))
+        lst.insert_sorted(rng.randrange(50), parent if parent and lst.exists(parent) else None)
+    return lst
+
+
+def test_insert_sorted_keeps_branches_sorted():
+    rng = Random(1)
+    lst = OrderedMultiList()
+    lst.insert_sorted(0)
+    values = []
+    for _ in range(300):
+        value = rng.randrange(100)
+        path = lst.insert_sorted(value, MultiListPath((0, )))
+        assert path == MultiListPath((0, bisect_right(values, value)))
+        values.insert(path[-1], value)
+    assert list(lst.iterate(MultiListPath((0, )), include_all_levels=False)) == values
+    assert list(lst.iterate_range(10, 20, MultiListPath((0, )))) == [i for i in values if 10 <= i < 20]
+    for value in range(-1, 101):
+        position = bisect_left(values, value)
+        expected = MultiListPath((0, position)) if position < len(values) and values[position] == value else None
+        assert lst.find_by_value(value, MultiListPath((0, ))) == expected
+
+
+def test_positional_changes_keep_the_order():
+    lst = OrderedMultiList.from_nested([(1, None), (3, [(5, None)]), (7, None)])
+    with pytest.raises(ValueError):
+        lst.append(9, MultiListPath((0, )))
+    with pytest.raises(ValueError):
+        lst.change_value(8, MultiListPath((1, )))
+    with pytest.raises(ValueError):
+        lst.swap(MultiListPath((0, )), MultiListPath((2, )))
+    with pytest.raises(ValueError):
+        lst.move(MultiListPath((0, )), MultiListPath((2, )))
+    assert lst.to_nested() == [(1, None), (3, [(5, None)]), (7, None)]
+    lst.move(MultiListPath((1, 0)), MultiListPath((2, )))
+    assert lst.to_nested() == [(1, None), (3, None), (5, None), (7, None)]
+    with pytest.raises(ValueError):
+        OrderedMultiList.from_nested([(2, None), (1, None)])
+
+
+def test_path_cache_cannot_be_enabled():
+    with pytest.raises(ValueError):
+        OrderedMultiList().set_path_cache_size(8)
+
+
+# the instrumented lookup is a copy of the real one, so it must find exactly the same nodes
+@pytest.mark.parametrize("seed", range(10))
+def test_observed_lookups_match_real_ones(seed):
+    rng = Random(seed)
+    lst = build(rng, 200)
+    observer = Observer()
+    paths = [MultiListPath(tuple(rng.randint(0, 30) for _ in range(rng.randint(1, 3)))) for _ in range(300)]
+    expected = [lst._find_node(path) for path in paths]
+    attach_observer(lst, observer)
+    assert [lst._find_node(path) for path in paths] == expected
+    lst.find(MultiListPath((0, )))
+    assert observer.stats["find"]["pointer_hops"] > 0
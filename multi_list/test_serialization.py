@@ -0,0 +1,57 @@
+from io import BytesIO, StringIO
+from random import Random
+
+import pytest
+
+from multi_list import MultiList, MultiListPath
+from serialization import JSON_READ_CHUNK_SIZE, dump_binary, dump_json, dump_ndjson, load_binary, load_json, \
+    load_ndjson
+
+
+# small chunks cut the JSON numbers at every possible place
+CHUNK_SIZES = (1, 2, 3, 5, 7, 16, JSON_READ_CHUNK_SIZE)
+
+
+def random_list(seed: int, count: int = 300) -> MultiList:
+    rng = Random(seed)
+    lst = MultiList()
+    width = 17
+    for i in range(count):
+        path = MultiListPath((i, )) if i < width else MultiListPath((i % width, i // width - 1))
+        lst.append(rng.choice((
+            rng.randint(-10 ** 6, 10 ** 6), rng.uniform(-10 ** 4, 10 ** 4), rng.random() * 10 ** rng.randint(-30, 30)
+        )), path)
+    return lst
+
+
+def round_trip(lst: MultiList, dump, load, stream_type) -> MultiList:
+    stream = stream_type()
+    dump(lst, stream)
+    stream.seek(0)
+    return load(stream)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("seed", range(5))
+def test_json_round_trip(seed, chunk_size):
+    lst = random_list(seed)
+    loaded = round_trip(lst, dump_json, lambda stream: load_json(stream, chunk_size), StringIO)
+    assert loaded.to_nested() == lst.to_nested()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ndjson_and_binary_round_trips(seed):
+    lst = random_list(seed)
+    assert round_trip(lst, dump_ndjson, load_ndjson, StringIO).to_nested() == lst.to_nested()
+    assert round_trip(lst, dump_binary, load_binary, BytesIO).to_nested() == lst.to_nested()
+
+
+def test_json_number_cut_by_chunk():
+    assert load_json(StringIO("[[1.5e3, null], [-2, null]]"), chunk_size=1).to_nested() == [(1500.0, None), (-2, None)]
+
+
+def test_json_number_cut_after_point_by_default_chunk():
+    padding = " " * (JSON_READ_CHUNK_SIZE - 1 - len("[[12"))
+    document = f"{padding}[[12.25, null]]"
+    assert document[JSON_READ_CHUNK_SIZE - 1] == "."
+    assert load_json(StringIO(document)).to_nested() == [(12.25, None)]
@@ -0,0 +1,81 @@
+from bisect import bisect_left
+from typing import Iterable
+
+
+class BisectList:
+    """
+    Sorted Python list maintained with bisect, which has the interface of SkipList used by the benchmarks
+    """
+    __slots__ = ("_items", )
+
+    def __init__(self):
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def from_iterable(self, source: Iterable):
+        self._items = sorted(set(self._items).union(source))
+
+    def append(self, value):
+        index = bisect_left(self._items, value)
+        if index < len(self._items) and self._items[index] == value:
+            raise ValueError(f"This value ({value}) already exists in the list")
+        self._items.insert(index, value)
+
+    def present(self, value) -> bool:
+        index = bisect_left(self._items, value)
+        return index < len(self._items) and self._items[index] == value
+
+    def delete(self, value):
+        index = bisect_left(self._items, value)
+        if index == len(self._items) or self._items[index] != value:
+            raise ValueError("This value does not exist in the list")
+        del self._items[index]
+
+    def iterate_range(self, start, stop=None):
+        for index in range(bisect_left(self._items, start), len(self._items)):
+            value = self._items[index]
+            if stop is not None and value >= stop:
+                return
+            yield value
+
+
+class SetBaseline:
+    """
+    Python set with the interface of SkipList used by the benchmarks. It keeps no order,
+    so every range scan sorts the matching values
+    """
+    __slots__ = ("_items", )
+
+    def __init__(self):
+        self._items = set()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(sorted(self._items))
+
+    def from_iterable(self, source: Iterable):
+        self._items.update(source)
+
+    def append(self, value):
+        if value in self._items:
+            raise ValueError(f"This value ({value}) already exists in the list")
+        self._items.add(value)
+
+    def present(self, value) -> bool:
+        return value in self._items
+
+    def delete(self, value):
+        try:
+            self._items.remove(value)
+        except KeyError:
+            raise ValueError("This value does not exist in the list")
+
+    def iterate_range(self, start, stop=None):
+        yield from sorted(value for value in self._items if start <= value and (stop is None or value < stop))
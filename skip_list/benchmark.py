@@ -1,44 +1,163 @@
-from concurrent.futures import ProcessPoolExecutor
+import sys
+from functools import partial
+from itertools import islice
 from random import randint
 from time import time_ns
 from argparse import BooleanOptionalAction
 
 from skip_list import SkipList
-from utils.benchmark import get_args, print_results
+from baselines import BisectList, SetBaseline
+from utils.benchmark import get_args, print_results, print_profile
+from utils.benchmark_suite import add_suite_arguments, run_suite, run_comparison, sequential_keys, reverse_keys, \
+    uniform_keys, worker_pool, zipfian_indexes
+from utils.histogram import Histogram
+from utils.profiling import Observer, attach_observer, detach_observer
 
+# the structure measured by the benchmark goes first, the others are baselines for '--baselines'
+STRUCTURES = {"skip_list": SkipList, "bisect": BisectList, "set": SetBaseline}
 
-def test(items_count: int, print_list: bool = False, as_tree: bool = False):
+
+def test(items_count: int, print_list: bool = False, as_tree: bool = False, profile: bool = False):
     lst = SkipList()
+    observer = Observer() if profile else None
+    if observer:
+        attach_observer(lst, observer)
     items_in_list = set()
-    result = [[], [], []]
+    result = [Histogram(), Histogram(), Histogram()]
     if as_tree:
         while len(items_in_list) < items_count:
             items_in_list.add(randint(0, items_count * 10))
         appending_time_start = time_ns()
         lst.from_iterable(items_in_list, tree_like=True)
         whole_appending_time = time_ns() - appending_time_start
-        result[0] = [whole_appending_time // items_count for _ in range(items_count)]
+        result[0].add(whole_appending_time // items_count, items_count)
     else:
         while len(lst) < items_count:
             item = randint(0, items_count * 10)
             try:
                 appending_time_start = time_ns()
                 lst.append(item)
-                result[0].append(time_ns() - appending_time_start)
+                result[0].add(time_ns() - appending_time_start)
                 items_in_list.add(item)
             except ValueError:
                 pass
     if print_list:
+        if observer:
+            detach_observer(lst)
         lst.print()
+        if observer:
+            attach_observer(lst, observer)
     for item in items_in_list:
         searching_time_start = time_ns()
         lst.present(item)
-        result[1].append(time_ns() - searching_time_start)
+        result[1].add(time_ns() - searching_time_start)
     for item in items_in_list:
         deleting_time_start = time_ns()
         lst.delete(item)
-        result[2].append(time_ns() - deleting_time_start)
-    return *result,
+        result[2].add(time_ns() - deleting_time_start)
+    return *result, observer.stats if observer else None
+
+
+def insert_all(lst: SkipList, keys, recorder):
+    for key in keys:
+        start = time_ns()
+        lst.append(key)
+        recorder.add("insert", time_ns() - start)
+
+
+def search_all(lst: SkipList, keys, recorder):
+    for key in keys:
+        start = time_ns()
+        lst.present(key)
+        recorder.add("search", time_ns() - start)
+
+
+def delete_all(lst: SkipList, keys, recorder):
+    for key in keys:
+        start = time_ns()
+        lst.delete(key)
+        recorder.add("delete", time_ns() - start)
+
+
+def sequential_workload(count, recorder, rng, args, structure="skip_list"):
+    lst = recorder.observe(STRUCTURES[structure]())
+    insert_all(lst, sequential_keys(count), recorder)
+    search_all(lst, sequential_keys(count), recorder)
+    delete_all(lst, sequential_keys(count), recorder)
+
+
+def reverse_workload(count, recorder, rng, args, structure="skip_list"):
+    lst = recorder.observe(STRUCTURES[structure]())
+    insert_all(lst, reverse_keys(count), recorder)
+    search_all(lst, reverse_keys(count), recorder)
+    delete_all(lst, reverse_keys(count), recorder)
+
+
+def uniform_workload(count, recorder, rng, args, structure="skip_list"):
+    lst = recorder.observe(STRUCTURES[structure]())
+    keys = uniform_keys(count, rng)
+    insert_all(lst, keys, recorder)
+    search_all(lst, keys, recorder)
+    delete_all(lst, keys, recorder)
+
+
+def zipfian_workload(count, recorder, rng, args, structure="skip_list"):
+    lst = recorder.observe(STRUCTURES[structure]())
+    keys = uniform_keys(count, rng)
+    lst.from_iterable(keys)
+    search_all(lst, (keys[i] for i in zipfian_indexes(count, count, rng)), recorder)
+
+
+def mixed_workload(count, recorder, rng, args, structure="skip_list"):
+    """
+    Starts with a half of the keys and makes count lookups and changes (insertions or deletions) of random keys
+    """
+    lst = recorder.observe(STRUCTURES[structure]())
+    keys = uniform_keys(count, rng)
+    inserted, spare = keys[:count // 2], keys[count // 2:]
+    lst.from_iterable(inserted)
+    for _ in range(count):
+        if rng.random() < args.read_ratio and inserted:
+            key = inserted[rng.randrange(len(inserted))]
+            start = time_ns()
+            lst.present(key)
+            recorder.add("search", time_ns() - start)
+            continue
+        source, destination = (inserted, spare) if inserted and (not spare or rng.random() < 0.5) else (spare, inserted)
+        index = rng.randrange(len(source))
+        key = source[index]
+        source[index] = source[-1]
+        source.pop()
+        destination.append(key)
+        start = time_ns()
+        if source is inserted:
+            lst.delete(key)
+            recorder.add("delete", time_ns() - start)
+        else:
+            lst.append(key)
+            recorder.add("insert", time_ns() - start)
+
+
+def range_scan_workload(count, recorder, rng, args, structure="skip_list"):
+    lst = recorder.observe(STRUCTURES[structure]())
+    keys = uniform_keys(count, rng)
+    lst.from_iterable(keys)
+    for _ in range(max(1, count // args.scan_length)):
+        start_key = keys[rng.randrange(count)]
+        start = time_ns()
+        for _ in islice(lst.iterate_range(start_key), args.scan_length):
+            pass
+        recorder.add("scan", time_ns() - start)
+
+
+WORKLOADS = {
+    "sequential": sequential_workload,
+    "reverse": reverse_workload,
+    "uniform": uniform_workload,
+    "zipfian": zipfian_workload,
+    "mixed": mixed_workload,
+    "range_scan": range_scan_workload
+}
 
 
 def main():
@@ -47,23 +166,37 @@ def main():
             "-t", "--tree",
             help="Build the list as a binary tree",
             required=False, action=BooleanOptionalAction, default=False
-        )
+        ),
+        lambda parser: add_suite_arguments(parser, WORKLOADS)
     ])
-    executor = ProcessPoolExecutor()
-    addition_time = []
-    search_time = []
-    deletion_time = []
-    try:
-        for addition, search, deletion in executor.map(
-                test, *zip(*((args.count, args.print, args.tree) for _ in range(args.iterations)))
+    if args.baselines:
+        names = WORKLOADS if args.workload in (None, "all") else (args.workload, )
+        return run_comparison(
+            {name: {structure: partial(WORKLOADS[name], structure=structure) for structure in STRUCTURES}
+             for name in names},
+            args.sizes or (args.count, ), args
+        )
+    if args.workload:
+        names = WORKLOADS if args.workload == "all" else (args.workload, )
+        if not run_suite({name: WORKLOADS[name] for name in names}, args):
+            sys.exit(1)
+        return
+    addition_time = Histogram()
+    search_time = Histogram()
+    deletion_time = Histogram()
+    observer = Observer()
+    with worker_pool() as executor:
+        for addition, search, deletion, stats in executor.map(
+                test, *zip(*((args.count, args.print, args.tree, args.profile) for _ in range(args.iterations)))
         ):
-            addition_time.extend(addition)
-            search_time.extend(search)
-            deletion_time.extend(deletion)
-    finally:
-        executor.shutdown(wait=False, cancel_futures=True)
+            observer.merge(stats or {})
+            addition_time.merge(addition)
+            search_time.merge(search)
+            deletion_time.merge(deletion)
     for name, results in (("Addition", addition_time), ("Search", search_time), ("Deletion", deletion_time)):
         print_results(name, results, only_average=(args.tree and name == "Addition"))
+    if args.profile:
+        print_profile(observer.summary())
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 from skip_list import SkipList
-from utils.cli import CommandInterface
+from utils.cli import CommandInterface, OPTIONS_HELP
 
 
 class SkipListCommandInterface(CommandInterface):
@@ -39,6 +39,7 @@ class SkipListCommandInterface(CommandInterface):
             "but as a levels of a balanced binary tree.\n"
             "copy make|restore|switch|delete - control the copy of list\n"
             "clear - clear the skip-list\n"
+            + OPTIONS_HELP
         )
 
     def control_item_type(self, action: str, item_type: str = None):
@@ -99,6 +100,6 @@ class SkipListCommandInterface(CommandInterface):
 
 if __name__ == "__main__":
     try:
-        SkipListCommandInterface()()
+        SkipListCommandInterface().run()
     except (KeyboardInterrupt, EOFError):
         print("\nExit")
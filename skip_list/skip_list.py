@@ -1,7 +1,12 @@
-from typing import List, Callable, Iterable
+import sys
+from typing import List, Callable, Iterable, TextIO
 from math import log2
 from random import randint
 
+from utils.profiling import observable
+from utils.render import BufferedTextWriter, truncate, check_output_format, dot_quote, write_text_levels, \
+    write_jsonl_levels
+
 
 class SkipListNode:
     def __init__(self, value, levels: int):
@@ -16,6 +21,28 @@ class SkipListNode:
         return len(self.right)
 
 
+def _observed_find_predecessors(self: "SkipList", value) -> List[SkipListNode]:
+    update: List[SkipListNode | None] = [None for _ in range(self.levels)]
+    current = self.root
+    hops = 0
+    for i in range(self.levels - 1, -1, -1):
+        while current.right[i] and current.right[i].value < value:
+            current = current.right[i]
+            hops += 1
+        update[i] = current
+    self._observer.count("pointer_hops", hops + len(update))
+    return update
+
+
+def _observed_append(self: "SkipList", value, level: int | None = None):
+    self._observed_class._append(self, value, level)
+    self._observer.count("allocations")
+
+
+@observable(
+    ("append", "delete", "present", "from_iterable", "iterate_range", "copy", "clear", "render"),
+    {"_find_predecessors": _observed_find_predecessors, "_append": _observed_append}
+)
 class SkipList:
     def __init__(self, max_level: Callable[[int], int] | int | None = None):
         self._count = 0
@@ -63,17 +90,24 @@ class SkipList:
             for i in set(source):
                 self.append(i)
 
-    def _append(self, value, level: int | None = None):
-        node = SkipListNode(value, level + 1 if level is not None else self._generate_levels_count_randomly())
-        current = self.root
-        if self.root.levels < node.levels:
-            self.root.right.append(None)
+    def _find_predecessors(self, value) -> List[SkipListNode]:
+        """
+        Returns the last node with a value less than the given one on every level
+        """
         update: List[SkipListNode | None] = [None for _ in range(self.levels)]
+        current = self.root
         for i in range(self.levels - 1, -1, -1):
             while current.right[i] and current.right[i].value < value:
                 current = current.right[i]
             update[i] = current
-        current = current.right[0]
+        return update
+
+    def _append(self, value, level: int | None = None):
+        node = SkipListNode(value, level + 1 if level is not None else self._generate_levels_count_randomly())
+        if self.root.levels < node.levels:
+            self.root.right.append(None)
+        update = self._find_predecessors(value)
+        current = update[0].right[0]
         if current is not None and current.value == value:
             raise ValueError(f"This value ({value}) already exists in the list")
         if node.levels >= self.levels:
@@ -98,24 +132,72 @@ class SkipList:
     def __iter__(self):
         return self._iterate()
 
+    def _iterate_level(self, level: int):
+        node = self.root.right[level]
+        while node:
+            yield node.value
+            node = node.right[level]
+
+    def _iterate_levels(self, head: int | None = None, tail: int | None = None, max_depth: int | None = None):
+        if not self.root.right:
+            yield 0, ((None, iter(())), )
+            return
+        for level in range(self.levels if max_depth is None else min(self.levels, max_depth + 1)):
+            count = self._count if level == 0 else None
+            yield level, ((None, truncate(self._iterate_level(level), count, head, tail)), )
+
+    @staticmethod
+    def _format_value(value) -> str:
+        return f'"{value}"' if isinstance(value, str) else str(value)
+
+    def _write_dot(self, writer: BufferedTextWriter, head: int | None, tail: int | None, max_depth: int | None):
+        levels = self.levels if max_depth is None else min(self.levels, max_depth + 1)
+        fields = "|".join(f"<l{level}> " for level in range(levels - 1, -1, -1))
+        writer.write("digraph SkipList {\n    rankdir=LR;\n    node [shape=record];\n")
+        writer.write(f"    head [label=\"{fields}\"];\n")
+        last_shown = [(f"head:l{level}", False) for level in range(levels)]
+        for index, node in truncate(self._iterate(get_raw_nodes=True), self._count, head, tail):
+            if index is None:
+                writer.write(f"    more [label={dot_quote(f'... {node} more')}, shape=plaintext];\n")
+                writer.write(f"    {last_shown[0][0]} -> more;\n")
+                last_shown = [("more", False)] + [(port, True) for port, _ in last_shown[1:]]
+                continue
+            node_levels = min(node.levels, levels)
+            node_id = f"n{index}"
+            fields = "|".join(f"<l{level}> " for level in range(node_levels - 1, 0, -1))
+            label = (fields + "|" if fields else "") + "<l0> " + dot_quote(self._format_value(node.value))[1:-1]
+            writer.write(f"    {node_id} [label=\"{label}\"];\n")
+            for level in range(node_levels):
+                previous_port, skipped = last_shown[level]
+                style = " [style=dashed]" if skipped else ""
+                writer.write(f"    {previous_port} -> {node_id}:l{level}{style};\n")
+                last_shown[level] = (f"{node_id}:l{level}", False)
+        writer.write("}\n")
+
+    def render(
+            self, stream: TextIO | None = None, output_format: str = "text",
+            head: int | None = None, tail: int | None = None, max_depth: int | None = None
+    ):
+        """
+        Writes the skip-list level by level to the stream (stdout by default) as text, JSON lines or Graphviz DOT.
+        Only the first head and the last tail items of every level are written if any of them is specified,
+        and only levels up to max_depth
+        """
+        check_output_format(output_format)
+        with BufferedTextWriter(stream or sys.stdout) as writer:
+            if output_format == "text":
+                write_text_levels(writer, self._iterate_levels(head, tail, max_depth), "Level {}:", self._format_value)
+            elif output_format == "jsonl":
+                write_jsonl_levels(writer, self._iterate_levels(head, tail, max_depth))
+            else:
+                self._write_dot(writer, head, tail, max_depth)
+
     def print(self):
-        levels = [[] for _ in self.root.right]
-        for node in self._iterate(get_raw_nodes=True):
-            for level in range(node.levels):
-                levels[level].append(f'"{node.value}"' if isinstance(node.value, str) else str(node.value))
-        for level in range(len(levels)):
-            print(f"Level {level}:", '[' + ", ".join(levels[level]) + ']')
-        if not levels:
-            print("Level 0:", '[]')
+        self.render()
 
     def delete(self, value):
-        update: List[SkipListNode | None] = [None for _ in range(self.levels)]
-        current = self.root
-        for i in range(self.levels - 1, -1, -1):
-            while current.right[i] and current.right[i].value < value:
-                current = current.right[i]
-            update[i] = current
-        current = current.right[0] if current.right else None
+        update = self._find_predecessors(value)
+        current = update[0].right[0] if update else None
         if current is None or current.value != value:
             raise ValueError("This value does not exist in the list")
         for i in range(self.levels):
@@ -134,6 +216,16 @@ class SkipList:
         current = current.right[0] if current.right else None
         return current and current.value == value
 
+    def iterate_range(self, start, stop=None):
+        """
+        Yields values from start (inclusive) to stop (exclusive, or to the end if it is None) in order
+        """
+        update = self._find_predecessors(start)
+        current = update[0].right[0] if update else None
+        while current and (stop is None or current.value < stop):
+            yield current.value
+            current = current.right[0]
+
     def copy(self) -> "SkipList":
         result = SkipList(self.max_level)
         result._count = self._count
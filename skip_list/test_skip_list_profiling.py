@@ -0,0 +1,57 @@
+from random import Random
+
+import pytest
+
+from skip_list import SkipList
+from utils.profiling import Observer, attach_observer, detach_observer
+
+
+# the instrumented search is a copy of the real one, so it must find exactly the same nodes
+@pytest.mark.parametrize("seed", range(20))
+def test_observed_search_matches_real_one(seed):
+    rng = Random(seed)
+    lst = SkipList()
+    lst.from_iterable(rng.sample(range(1000), 200))
+    observer = Observer()
+    for _ in range(200):
+        value = rng.randrange(-10, 1010)
+        expected = lst._find_predecessors(value)
+        attach_observer(lst, observer)
+        assert lst._find_predecessors(value) == expected
+        assert lst.present(value) == SkipList.present(lst, value)
+        detach_observer(lst)
+
+
+def test_pointer_hops():
+    lst = SkipList()
+    observer = Observer()
+    attach_observer(lst, observer)
+    for value in range(100):
+        lst.append(value)
+    observer.reset()
+    lst.delete(50)
+    assert 0 < observer.stats["delete"]["pointer_hops"] <= 50 + lst.levels
+
+
+def test_failed_calls_are_counted_separately():
+    lst = SkipList()
+    observer = Observer()
+    attach_observer(lst, observer)
+    lst.append(1)
+    with pytest.raises(ValueError):
+        lst.append(1)
+    assert (observer.stats["append"]["count"], observer.stats["append"]["failed"]) == (1, 1)
+    assert observer.summary()["append"]["mean_allocations"] == 1
+
+
+def test_generator_operations_are_accounted_when_finished():
+    lst = SkipList()
+    lst.from_iterable(range(100))
+    observer = Observer()
+    attach_observer(lst, observer)
+    scan = lst.iterate_range(10, 20)
+    next(scan)
+    assert "iterate_range" not in observer.stats
+    assert list(scan) == list(range(11, 20))
+    assert observer.stats["iterate_range"]["count"] == 1
+    assert observer.stats["iterate_range"]["pointer_hops"] > 0
@@ -1,5 +1,7 @@
 import argparse
 
+from utils.histogram import Histogram
+
 
 def positive_int(value):
     try:
@@ -41,11 +43,26 @@ def get_args(additional_functions: list = None):
     return args
 
 
-def print_results(name, results, only_average: bool = False) -> None:
-    average = (sum(results) / len(results)) / 1000
+def print_results(name, results: Histogram | list, only_average: bool = False) -> None:
+    if not isinstance(results, Histogram):
+        results = Histogram.from_values(results)
     print(f"{name} time (μs):")
-    print("\tAverage:", average)
+    print("\tAverage:", results.mean / 1000)
     if not only_average:
-        print("\tMin:", min(results) / 1000)
-        print("\tMax:", max(results) / 1000)
-        print("\tStandard deviation", (sum((average - (i / 1000)) ** 2 for i in results) / len(results)) ** 0.5)
+        print("\tMin:", results.min / 1000)
+        print("\tMax:", results.max / 1000)
+        print("\tStandard deviation", results.stddev / 1000)
+
+
+def print_memory_results(name, results, items_count: int) -> None:
+    average = sum(results) / len(results)
+    print(f"{name} memory (bytes):")
+    print("\tAverage:", average)
+    print("\tPer item:", average / items_count)
+
+
+def print_profile(summary: dict) -> None:
+    for operation, stats in summary.items():
+        print(f"{operation} profile:")
+        for counter, value in stats.items():
+            print(f"\t{counter}:", value)
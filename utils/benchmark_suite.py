@@ -0,0 +1,330 @@
+import argparse
+import json
+import sys
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import accumulate
+from random import Random
+from time import time_ns
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from utils.benchmark import positive_int, float_01, print_profile
+from utils.histogram import Histogram
+from utils.profiling import Observer, attach_observer, is_observable
+
+
+PERCENTILES = (50, 90, 99, 99.9)
+DEFAULT_READ_RATIO = 0.9
+DEFAULT_SCAN_LENGTH = 100
+DEFAULT_ZIPF_EXPONENT = 1.1
+DEFAULT_REGRESSION_THRESHOLD = 0.1
+
+
+class Recorder:
+    """
+    Collects durations (ns) of the operations of a workload into a histogram per operation name,
+    so its memory does not depend on count of the operations. With profile, it also has an observer
+    for the structures of the workload
+    """
+    def __init__(self, profile: bool = False):
+        self.results: Dict[str, Histogram] = {}
+        self.observer = Observer() if profile else None
+
+    def observe(self, structure):
+        """
+        Attaches the observer to the structure if profiling and the structure supports it, returns the structure
+        """
+        if self.observer is not None and is_observable(structure):
+            attach_observer(structure, self.observer)
+        return structure
+
+    def add(self, operation: str, duration: int):
+        histogram = self.results.get(operation)
+        if histogram is None:
+            histogram = self.results[operation] = Histogram()
+        histogram.add(duration)
+
+
+class NullRecorder(Recorder):
+    def add(self, operation: str, duration: int):
+        pass
+
+
+# a workload gets count of items, a recorder, a seeded random generator and the parsed arguments
+Workload = Callable[[int, Recorder, Random, argparse.Namespace], None]
+
+
+def sequential_keys(count: int) -> range:
+    return range(count)
+
+
+def reverse_keys(count: int) -> range:
+    return range(count - 1, -1, -1)
+
+
+def uniform_keys(count: int, rng: Random) -> List[int]:
+    return rng.sample(range(count * 10), count)
+
+
+def zipfian_indexes(count: int, samples: int, rng: Random, exponent: float = DEFAULT_ZIPF_EXPONENT) -> List[int]:
+    """
+    Returns samples indexes in range(count), where index k is drawn with weight 1 / (k + 1) ** exponent,
+    so a few hot indexes are drawn most of the time
+    """
+    weights = accumulate(1 / (rank + 1) ** exponent for rank in range(count))
+    return rng.choices(range(count), cum_weights=list(weights), k=samples)
+
+
+def positive_ints(value: str) -> List[int]:
+    return [positive_int(i) for i in value.split(",")]
+
+
+def add_suite_arguments(parser: argparse.ArgumentParser, workload_names):
+    parser.add_argument(
+        "-w", "--workload", help="Run a named workload (or all of them) instead of the default benchmark",
+        choices=(*workload_names, "all"), required=False, default=None
+    )
+    parser.add_argument(
+        "--read_ratio", help="Share of lookups in the mixed workload", type=float_01, required=False,
+        default=DEFAULT_READ_RATIO
+    )
+    parser.add_argument(
+        "--scan_length", help="Count of items read by every range scan", type=positive_int, required=False,
+        default=DEFAULT_SCAN_LENGTH
+    )
+    parser.add_argument(
+        "--memory", help="Measure peak memory of every workload in a separate untimed run",
+        required=False, action=argparse.BooleanOptionalAction, default=True
+    )
+    parser.add_argument(
+        "--profile", help="Collect profiles of the operations (pointer hops, path lengths, allocations, time)",
+        required=False, action=argparse.BooleanOptionalAction, default=False
+    )
+    parser.add_argument(
+        "--baselines", help="Run the workloads (all by default) on the baseline structures too and print a comparison",
+        required=False, action=argparse.BooleanOptionalAction, default=False
+    )
+    parser.add_argument(
+        "--sizes", help="Comma-separated counts of items to compare with '--baselines' (only '--count' by default)",
+        type=positive_ints, required=False
+    )
+    parser.add_argument("--json", help="Write the results as JSON to this file ('-' for stdout)", required=False)
+    parser.add_argument("--compare", help="Compare the results with a JSON file of a previous run", required=False)
+    parser.add_argument(
+        "--threshold", help="Relative change treated as a regression by '--compare'", type=float, required=False,
+        default=DEFAULT_REGRESSION_THRESHOLD
+    )
+
+
+def run_workload(workload: Workload, count: int, seed: int, args: argparse.Namespace, measure_memory: bool):
+    recorder = Recorder(args.profile)
+    start = time_ns()
+    workload(count, recorder, Random(seed), args)
+    elapsed = time_ns() - start
+    peak_memory = None
+    if measure_memory:
+        tracemalloc.start()
+        workload(count, NullRecorder(), Random(seed), args)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return recorder.results, elapsed, peak_memory, recorder.observer.stats if recorder.observer else None
+
+
+def summarize(results: Histogram) -> dict:
+    """
+    Summarizes durations (ns) of an operation, times are in μs
+    """
+    summary = {
+        "count": results.count,
+        "mean": results.mean / 1000,
+        "stddev": results.stddev / 1000,
+        "min": results.min / 1000,
+        "max": results.max / 1000,
+    }
+    for percent in PERCENTILES:
+        summary[f"p{percent}"] = results.percentile(percent) / 1000
+    summary["ops_per_second"] = results.count / (results.total / 1e9) if results.total else None
+    return summary
+
+
+def print_summary(workload_name: str, results: dict):
+    for operation, summary in results["operations"].items():
+        print(f"{workload_name} / {operation} time (μs):")
+        print("\tCount:", summary["count"])
+        print("\tMean:", summary["mean"])
+        for percent in PERCENTILES:
+            print(f"\tp{percent}:", summary[f"p{percent}"])
+        print("\tMax:", summary["max"])
+        print("\tOperations/s:", summary["ops_per_second"])
+    if results["peak_memory"] is not None:
+        print(f"{workload_name} peak memory (bytes):", results["peak_memory"])
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    Returns descriptions of the latencies, throughputs and memory, which are worse than in the baseline
+    by more than threshold (relative)
+    """
+    regressions = []
+
+    def check(name: str, value, base_value, higher_is_better: bool = False):
+        if value is None or not base_value:
+            return
+        change = (value - base_value) / base_value
+        if (-change if higher_is_better else change) > threshold:
+            regressions.append(f"{name}: {base_value} -> {value} ({change:+.1%})")
+
+    for workload_name, workload_results in results["workloads"].items():
+        base_workload = baseline.get("workloads", {}).get(workload_name)
+        if base_workload is None:
+            continue
+        for operation, summary in workload_results["operations"].items():
+            base_summary = base_workload["operations"].get(operation)
+            if base_summary is None:
+                continue
+            for key in ("p50", "p99"):
+                check(f"{workload_name} / {operation} {key} (μs)", summary[key], base_summary[key])
+            check(
+                f"{workload_name} / {operation} operations/s", summary["ops_per_second"],
+                base_summary["ops_per_second"], higher_is_better=True
+            )
+        check(f"{workload_name} peak memory (bytes)", workload_results["peak_memory"], base_workload["peak_memory"])
+    return regressions
+
+
+def merge_runs(runs) -> Tuple[Dict[str, Histogram], int | None]:
+    """
+    Merges the results of run_workload calls into histograms by operation name and the largest peak memory
+    """
+    operations: Dict[str, Histogram] = {}
+    peak_memory = None
+    for workload_results, _, workload_memory, _ in runs:
+        for operation, histogram in workload_results.items():
+            operations.setdefault(operation, Histogram()).merge(histogram)
+        if workload_memory is not None:
+            peak_memory = max(peak_memory or 0, workload_memory)
+    return operations, peak_memory
+
+
+def write_json(results: dict, file_name: str):
+    if file_name == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    with open(file_name, "w") as file:
+        json.dump(results, file, indent=2)
+
+
+def format_table(header: Sequence[str], rows: Iterable[Sequence[str]]) -> str:
+    rows = [header, *rows]
+    widths = [max(len(row[column]) for row in rows) for column in range(len(header))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(row, widths)).rstrip() for row in rows)
+
+
+def _ratio(value, reference) -> float | None:
+    return value / reference if value is not None and reference else None
+
+
+def _format_number(value) -> str:
+    return "-" if value is None else f"{value:.4g}"
+
+
+@contextmanager
+def worker_pool() -> Iterator[ProcessPoolExecutor]:
+    """
+    Process pool, which waits for its workers on exit, so they are not left writing to closed pipes.
+    On KeyboardInterrupt the queued work is cancelled first
+    """
+    executor = ProcessPoolExecutor()
+    try:
+        yield executor
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown()
+
+
+def run_comparison(workloads: Dict[str, Dict[str, Workload]], sizes: Iterable[int], args: argparse.Namespace):
+    """
+    Runs every workload on every structure (workloads[name][structure]) with every count of items
+    and prints a table of throughput, latency and peak memory, where the ratios are relative to the first structure
+    of the workload, so the sizes where a baseline gets faster or smaller are visible
+    """
+    with worker_pool() as executor:
+        runs = {
+            (name, size, structure): executor.map(
+                run_workload, *zip(*((workload, size, seed, args, args.memory) for seed in range(args.iterations)))
+            )
+            for name, structures in workloads.items() for size in sizes for structure, workload in structures.items()
+        }
+        rows = []
+        references = {}
+        for (name, size, structure), workload_runs in runs.items():
+            operations, peak_memory = merge_runs(workload_runs)
+            for operation, histogram in operations.items():
+                summary = summarize(histogram)
+                reference = references.setdefault((name, size, operation), (summary, peak_memory))
+                rows.append({
+                    "workload": name, "count": size, "structure": structure, "operation": operation,
+                    "ops_per_second": summary["ops_per_second"], "p50": summary["p50"], "p99": summary["p99"],
+                    "peak_memory": peak_memory,
+                    "relative_ops_per_second": _ratio(summary["ops_per_second"], reference[0]["ops_per_second"]),
+                    "relative_p50": _ratio(summary["p50"], reference[0]["p50"]),
+                    "relative_peak_memory": _ratio(peak_memory, reference[1])
+                })
+    print(format_table(
+        ("Workload", "Count", "Structure", "Operation", "Ops/s", "x Ops/s", "p50 (μs)", "p99 (μs)", "x p50",
+         "Peak memory", "x Memory"),
+        (
+            (row["workload"], str(row["count"]), row["structure"], row["operation"],
+             _format_number(row["ops_per_second"]), _format_number(row["relative_ops_per_second"]),
+             _format_number(row["p50"]), _format_number(row["p99"]), _format_number(row["relative_p50"]),
+             str(row["peak_memory"] if row["peak_memory"] is not None else "-"),
+             _format_number(row["relative_peak_memory"]))
+            for row in rows
+        )
+    ))
+    if args.json:
+        write_json({"iterations": args.iterations, "comparison": rows}, args.json)
+
+
+def run_suite(workloads: Dict[str, Workload], args: argparse.Namespace) -> bool:
+    """
+    Runs every workload args.iterations times in worker processes, prints the summaries, writes them as JSON
+    and compares them with the baseline if requested. Returns False if any regression was found
+    """
+    results = {"count": args.count, "iterations": args.iterations, "workloads": {}}
+    with worker_pool() as executor:
+        for workload_name, workload in workloads.items():
+            workload_runs = list(executor.map(
+                run_workload, *zip(*(
+                    (workload, args.count, seed, args, args.memory) for seed in range(args.iterations)
+                ))
+            ))
+            operations, peak_memory = merge_runs(workload_runs)
+            elapsed = sum(workload_time for _, workload_time, _, _ in workload_runs)
+            results["workloads"][workload_name] = {
+                "operations": {operation: summarize(histogram) for operation, histogram in operations.items()},
+                "wall_time": elapsed / args.iterations / 1e9,
+                "peak_memory": peak_memory
+            }
+            print_summary(workload_name, results["workloads"][workload_name])
+            if args.profile:
+                observer = Observer()
+                for *_, stats in workload_runs:
+                    observer.merge(stats or {})
+                results["workloads"][workload_name]["profile"] = observer.summary()
+                print_profile(observer.summary())
+    if args.json:
+        write_json(results, args.json)
+    if not args.compare:
+        return True
+    with open(args.compare) as file:
+        regressions = compare(results, json.load(file), args.threshold)
+    for regression in regressions:
+        print("Regression:", regression)
+    if not regressions:
+        print("No regressions")
+    return not regressions
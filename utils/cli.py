@@ -1,4 +1,29 @@
-from typing import Any
+"""
+Base of the interactive command interfaces of the structures (skip_list/cli.py, multi_list/cli.py).
+The scripts take these options:
+-b, --batch FILE|- - execute commands from the FILE (or from stdin for '-') instead of prompting them,
+    one command per line, lines starting with '#' are skipped. Piped stdin turns the batch mode on by itself
+-t, --timing - print time spent on every command type to stderr after the batch
+-r, --record FILE - append the commands entered interactively to the FILE to replay it with '--batch'
+"""
+import argparse
+import sys
+from contextlib import redirect_stdout
+from time import time_ns
+from typing import Any, Dict, Iterable, List, TextIO
+
+from utils.benchmark import print_results
+from utils.histogram import Histogram
+from utils.render import BufferedTextWriter
+
+
+OPTIONS_HELP = (
+    "Options of the script:\n"
+    "-b, --batch FILE|- - execute commands from the FILE (or from stdin for '-') instead of prompting them, "
+    "lines starting with '#' are skipped. Piped stdin turns the batch mode on by itself\n"
+    "-t, --timing - print time spent on every command type to stderr after the batch\n"
+    "-r, --record FILE - append the commands entered interactively to the FILE to replay it with '--batch'\n"
+)
 
 
 class CommandInterface:
@@ -8,23 +33,99 @@ class CommandInterface:
         self.lst_copy: Any | None = None
         self.commands = {}
 
-    def __call__(self):
-        while True:
-            try:
-                command = [i for i in input(">> ").split() if i]
-            except KeyboardInterrupt:
-                print()
-                continue
-            if not command:
-                continue
-            if command[0] not in self.commands:
-                print(f"Unrecognized command '{command[0]}'")
-                print("Enter 'help' for more information")
-                continue
-            try:
-                self.commands[command[0]](*command[1:])
-            except TypeError:
-                print("Invalid parameters")
+    def __call__(self, record_file: str | None = None):
+        """
+        Executes commands entered interactively. With record_file, the recognized commands are appended to it,
+        so the session can be replayed by run_batch
+        """
+        record = open(record_file, "a") if record_file else None
+        try:
+            while True:
+                try:
+                    line = input(">> ")
+                except KeyboardInterrupt:
+                    print()
+                    continue
+                if self.dispatch(line.split()) and record:
+                    record.write(" ".join(line.split()) + "\n")
+                    record.flush()
+        finally:
+            if record:
+                record.close()
+
+    def dispatch(self, command: List[str]) -> bool:
+        """
+        Executes a command split into words. Returns False if the command is empty or unrecognized
+        """
+        if not command:
+            return False
+        handler = self.commands.get(command[0])
+        if handler is None:
+            print(f"Unrecognized command '{command[0]}'")
+            print("Enter 'help' for more information")
+            return False
+        try:
+            handler(*command[1:])
+        except TypeError:
+            print("Invalid parameters")
+        return True
+
+    def run_batch(self, lines: Iterable[str], timing: bool = False, stream: TextIO | None = None):
+        """
+        Executes commands from lines (one per line, lines starting with '#' are skipped) without prompting them.
+        The output is written to the stream (stdout by default) through a buffer.
+        With timing, time spent on every command type is printed to stderr in the end
+        """
+        timings: Dict[str, Histogram] = {}
+        dispatch = self.dispatch
+        with BufferedTextWriter(stream or sys.stdout) as writer, redirect_stdout(writer):
+            for line in lines:
+                command = line.split()
+                if not command or command[0].startswith("#"):
+                    continue
+                if not timing:
+                    dispatch(command)
+                    continue
+                start = time_ns()
+                if not dispatch(command):
+                    continue
+                duration = time_ns() - start
+                histogram = timings.get(command[0])
+                if histogram is None:
+                    histogram = timings[command[0]] = Histogram()
+                histogram.add(duration)
+        with redirect_stdout(sys.stderr):
+            for name, histogram in timings.items():
+                print_results(f"'{name}' ({histogram.count} commands)", histogram)
+
+    def run(self, args: List[str] | None = None):
+        """
+        Parses the command line arguments and runs the interface interactively or in the batch mode.
+        The batch mode is used if the commands are piped to stdin
+        """
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "-b", "--batch", help="Execute commands from the file ('-' for stdin) instead of prompting them",
+            required=False
+        )
+        parser.add_argument(
+            "-t", "--timing", help="Print time spent on every command type after the batch",
+            required=False, action=argparse.BooleanOptionalAction, default=False
+        )
+        parser.add_argument(
+            "-r", "--record", help="Append the commands entered interactively to the file to replay it with '--batch'",
+            required=False
+        )
+        args = parser.parse_args(args)
+        batch = args.batch
+        if batch is None and not sys.stdin.isatty():
+            batch = "-"
+        if batch is None:
+            return self(args.record)
+        if batch == "-":
+            return self.run_batch(sys.stdin, args.timing)
+        with open(batch) as file:
+            self.run_batch(file, args.timing)
 
     @staticmethod
     def help():
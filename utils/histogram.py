@@ -0,0 +1,106 @@
+from array import array
+from typing import Iterable
+
+
+DEFAULT_PRECISION_BITS = 7
+MAX_VALUE_BITS = 64
+
+
+class Histogram:
+    """
+    Fixed-memory histogram of non-negative ints (such as durations in ns) with log-scaled buckets (HDR-style):
+    values below 2 ** precision_bits are counted exactly, larger ones fall into buckets which are
+    2 ** (precision_bits - 1) per power of two wide, so the relative error is below 2 ** (1 - precision_bits).
+    Count, sum and sum of squares are kept exactly, so mean and variance do not depend on the buckets.
+    Histograms with the same precision can be merged
+    """
+    __slots__ = ("precision_bits", "counts", "count", "total", "total_squares", "min", "max")
+
+    def __init__(self, precision_bits: int = DEFAULT_PRECISION_BITS):
+        self.precision_bits = precision_bits
+        self.counts = array("q", bytes(8 * self._bucket_index((1 << MAX_VALUE_BITS) - 1, precision_bits) + 8))
+        self.count = 0
+        self.total = 0
+        self.total_squares = 0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def from_values(cls, values: Iterable[int], precision_bits: int = DEFAULT_PRECISION_BITS) -> "Histogram":
+        result = cls(precision_bits)
+        for value in values:
+            result.add(value)
+        return result
+
+    @staticmethod
+    def _bucket_index(value: int, precision_bits: int) -> int:
+        exponent = value.bit_length() - precision_bits
+        if exponent <= 0:
+            return value
+        return (exponent << (precision_bits - 1)) + (value >> exponent)
+
+    def _bucket_value(self, index: int) -> int:
+        """
+        Returns the middle of the range of values counted by the bucket
+        """
+        if index < 1 << self.precision_bits:
+            return index
+        exponent = ((index - (1 << self.precision_bits)) >> (self.precision_bits - 1)) + 1
+        mantissa = index - (exponent << (self.precision_bits - 1))
+        return (mantissa << exponent) + ((1 << exponent) - 1) // 2
+
+    def add(self, value: int, count: int = 1):
+        if value < 0:
+            raise ValueError("Histogram values must not be negative")
+        self.counts[self._bucket_index(value, self.precision_bits)] += count
+        self.count += count
+        self.total += value * count
+        self.total_squares += value * value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram"):
+        if other.precision_bits != self.precision_bits:
+            raise ValueError("Cannot merge histograms with different precision")
+        if not other.count:
+            return
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count
+
+    @property
+    def variance(self) -> float:
+        # the numerator is an exact int, so large values (squares of ns) do not lose precision
+        return (self.count * self.total_squares - self.total ** 2) / self.count ** 2
+
+    @property
+    def stddev(self) -> float:
+        return self.variance ** 0.5
+
+    def percentile(self, percent: float) -> int:
+        """
+        Returns an approximate value, which is not exceeded by percent of the values
+        """
+        if not self.count:
+            raise ValueError("Histogram is empty")
+        rank = min(self.count, max(1, int(self.count * percent / 100) + 1))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.max, max(self.min, self._bucket_value(index)))
+        return self.max
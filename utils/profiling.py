@@ -0,0 +1,225 @@
+import sys
+from functools import wraps
+from inspect import isgeneratorfunction
+from time import time_ns
+from typing import Callable, Dict, Iterable
+
+
+class Observer:
+    """
+    Collects per-operation statistics of the structures it is attached to: count of calls, wall time (ns),
+    and counters reported by the instrumented internals (pointer hops, path lengths, allocations etc.).
+    Calls of operations made by other operations are accounted to the outermost one.
+    Generator operations are measured only while they run, and are accounted once they are finished or closed.
+    Calls which raise an exception are counted only as "failed", so counts and counters describe successful calls.
+    If callback and period are given, the callback gets the summary after every period operations.
+    With track_allocated_blocks, the change of sys.getallocatedblocks() is counted too (it is slow)
+    """
+    def __init__(
+            self, callback: Callable[[dict], None] | None = None, period: int = 0, track_allocated_blocks: bool = False
+    ):
+        self.callback = callback
+        self.period = period
+        self.track_allocated_blocks = track_allocated_blocks
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._depth = 0
+        self._counters: Dict[str, int] = {}
+        self._operations_count = 0
+
+    def count(self, counter: str, value: int = 1):
+        self._counters[counter] = self._counters.get(counter, 0) + value
+
+    def _begin(self) -> tuple | None:
+        self._depth += 1
+        if self._depth > 1:
+            return None
+        self._counters = {}
+        return time_ns(), sys.getallocatedblocks() if self.track_allocated_blocks else 0
+
+    def _end(self, operation: str, start: tuple | None, failed: bool = False):
+        self._depth -= 1
+        if start is None:
+            return
+        duration = time_ns() - start[0]
+        if self.track_allocated_blocks:
+            self.count("allocated_blocks", sys.getallocatedblocks() - start[1])
+        self._record(operation, duration, self._counters, failed)
+
+    def _resume(self, span: "_Span") -> tuple | None:
+        """
+        Starts measuring a step of a generator operation, its counters are collected into the span
+        """
+        self._depth += 1
+        if self._depth > 1:
+            return None
+        self._counters = span.counters
+        span.measured = True
+        return time_ns(), sys.getallocatedblocks() if self.track_allocated_blocks else 0
+
+    def _pause(self, span: "_Span", start: tuple | None):
+        self._depth -= 1
+        if start is None:
+            return
+        span.wall_time += time_ns() - start[0]
+        if self.track_allocated_blocks:
+            self.count("allocated_blocks", sys.getallocatedblocks() - start[1])
+
+    def _finish(self, operation: str, span: "_Span", failed: bool = False):
+        if span.measured:
+            self._record(operation, span.wall_time, span.counters, failed)
+
+    def _record(self, operation: str, duration: int, counters: Dict[str, int], failed: bool = False):
+        stats = self.stats.get(operation)
+        if stats is None:
+            stats = self.stats[operation] = {"count": 0, "wall_time": 0}
+        if failed:
+            stats["failed"] = stats.get("failed", 0) + 1
+            return
+        stats["count"] += 1
+        stats["wall_time"] += duration
+        for counter, value in counters.items():
+            stats[counter] = stats.get(counter, 0) + value
+        self._operations_count += 1
+        if self.callback and self.period and self._operations_count % self.period == 0:
+            self.callback(self.summary())
+
+    def summary(self) -> dict:
+        """
+        Returns the statistics by operation name, with the mean values of every counter per successful call
+        and the mean wall time in μs
+        """
+        result = {}
+        for operation, stats in self.stats.items():
+            result[operation] = dict(stats)
+            if not stats["count"]:
+                continue
+            result[operation]["mean_time"] = stats["wall_time"] / stats["count"] / 1000
+            for counter, value in stats.items():
+                if counter not in ("count", "wall_time", "failed"):
+                    result[operation][f"mean_{counter}"] = value / stats["count"]
+        return result
+
+    def merge(self, stats: Dict[str, Dict[str, int]]):
+        """
+        Adds the statistics collected by another observer (for example, in another process)
+        """
+        for operation, operation_stats in stats.items():
+            target = self.stats.setdefault(operation, {})
+            for counter, value in operation_stats.items():
+                target[counter] = target.get(counter, 0) + value
+
+    def reset(self):
+        self.stats.clear()
+        self._operations_count = 0
+
+
+class _Span:
+    """
+    Wall time and counters of a generator operation collected over its steps
+    """
+    __slots__ = ("wall_time", "counters", "measured")
+
+    def __init__(self):
+        self.wall_time = 0
+        self.counters: Dict[str, int] = {}
+        self.measured = False
+
+
+# classes which can be observed: their operations and instrumented versions of their internal methods
+_OBSERVABLE: Dict[type, tuple] = {}
+
+
+def observable(operations: Iterable[str], instrumented: Dict[str, Callable] | None = None):
+    """
+    Class decorator, which registers the operations to be measured by an attached observer,
+    and instrumented versions of internal methods (they report counters to self._observer and may call
+    the original methods through self._observed_class). They are used only by the classes made
+    for attached observers, so the structure itself is not slowed down
+    """
+    def decorator(cls: type) -> type:
+        _OBSERVABLE[cls] = (tuple(operations), dict(instrumented or {}))
+        return cls
+    return decorator
+
+
+def _observe_method(operation: str, method: Callable) -> Callable:
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        observer = self._observer
+        start = observer._begin()
+        try:
+            result = method(self, *args, **kwargs)
+        except BaseException:
+            observer._end(operation, start, failed=True)
+            raise
+        observer._end(operation, start)
+        return result
+    return wrapper
+
+
+# returned by next() when an observed generator is exhausted
+_FINISHED = object()
+
+
+def _observe_generator(operation: str, method: Callable) -> Callable:
+    # the caller may run other operations between the steps, so only the steps themselves are measured
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        observer = self._observer
+        span = _Span()
+        iterator = method(self, *args, **kwargs)
+        failed = False
+        try:
+            while True:
+                start = observer._resume(span)
+                try:
+                    value = next(iterator, _FINISHED)
+                except BaseException:
+                    failed = True
+                    raise
+                finally:
+                    observer._pause(span, start)
+                if value is _FINISHED:
+                    return
+                yield value
+        finally:
+            iterator.close()
+            observer._finish(operation, span, failed)
+    return wrapper
+
+
+def attach_observer(structure, observer: Observer):
+    """
+    Switches the class of the structure to a subclass, whose operations report to the observer.
+    The structure keeps working as before and can be detached with detach_observer
+    """
+    detach_observer(structure)
+    cls = type(structure)
+    registered = next((base for base in cls.__mro__ if base in _OBSERVABLE), None)
+    if registered is None:
+        raise TypeError(f"{cls.__name__} cannot be observed")
+    operations, instrumented = _OBSERVABLE[registered]
+    namespace = {"__slots__": (), "_observer": observer, "_observed_class": cls}
+    for name, method in instrumented.items():
+        # methods overridden by a subclass of the registered class are kept as they are
+        if getattr(cls, name) is getattr(registered, name):
+            namespace[name] = method
+    for operation in operations:
+        method = namespace.get(operation) or getattr(cls, operation)
+        observe = _observe_generator if isgeneratorfunction(method) else _observe_method
+        namespace[operation] = observe(operation, method)
+    structure.__class__ = type(f"Observed{cls.__name__}", (cls, ), namespace)
+
+
+def detach_observer(structure):
+    cls = type(structure)
+    if "_observed_class" in cls.__dict__:
+        structure.__class__ = cls._observed_class
+
+
+def is_observable(structure) -> bool:
+    return any(base in _OBSERVABLE for base in type(structure).__mro__)
+
+
+def get_observer(structure) -> Observer | None:
+    return getattr(type(structure), "_observer", None)
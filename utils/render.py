@@ -0,0 +1,160 @@
+import json
+from collections import deque
+from typing import Any, Callable, Iterable, Iterator, TextIO, Tuple
+
+
+OUTPUT_FORMATS = ("text", "jsonl", "dot")
+DEFAULT_BUFFER_SIZE = 65536
+
+# a level of a structure: its number and groups of values, every group with an optional label
+Level = Tuple[int, Iterable[Tuple[Any, Iterable[Any]]]]
+
+
+class BufferedTextWriter:
+    def __init__(self, stream: TextIO, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self._parts = []
+        self._size = 0
+
+    def write(self, text: str):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            self.stream.write("".join(self._parts))
+            self._parts.clear()
+            self._size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+
+
+def truncate(items: Iterable, count: int | None, head: int | None = None, tail: int | None = None) -> Iterator[tuple]:
+    """
+    Yields (index, item) for the first head and the last tail of the items,
+    and a single (None, skipped_count) in place of the rest. Without head and tail all items are yielded.
+    If count of the items is unknown, up to tail items are buffered
+    """
+    if head is None and tail is None:
+        yield from enumerate(items)
+        return
+    head, tail = head or 0, tail or 0
+    if count is None:
+        items = iter(items)
+        index = -1
+        for index, item in zip(range(head), items):
+            yield index, item
+        last_items = deque(enumerate(items, index + 1), maxlen=tail) if tail else None
+        total = last_items[-1][0] + 1 if last_items else sum(1 for _ in items) + index + 1
+        if total > head + tail:
+            yield None, total - head - tail
+        if last_items:
+            yield from last_items
+        return
+    if head + tail >= count:
+        yield from enumerate(items)
+        return
+    skipped_reported = False
+    for index, item in enumerate(items):
+        if index < head or index >= count - tail:
+            yield index, item
+        elif not skipped_reported:
+            skipped_reported = True
+            yield None, count - head - tail
+            if not tail:
+                return
+
+
+def check_output_format(output_format: str):
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Output format must be one of {', '.join(OUTPUT_FORMATS)}")
+
+
+def format_text_value(value, highlight_string_values: bool = False) -> str:
+    return repr(value) if highlight_string_values and isinstance(value, str) else str(value)
+
+
+def dot_quote(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def write_text_levels(
+        writer: BufferedTextWriter, levels: Iterable[Level], level_header: str,
+        format_value: Callable[[Any], str] = str
+):
+    for level_number, groups in levels:
+        writer.write(level_header.format(level_number))
+        first_group = True
+        for label, items in groups:
+            writer.write(" " if first_group else ", ")
+            if label is not None:
+                writer.write(f"{label}:")
+            writer.write("[")
+            for index, (position, value) in enumerate(items):
+                if index:
+                    writer.write(", ")
+                writer.write(format_value(value) if position is not None else f"... {value} more")
+            writer.write("]")
+            first_group = False
+        writer.write("\n")
+
+
+def write_jsonl_levels(writer: BufferedTextWriter, levels: Iterable[Level], label_to_json: Callable[[Any], Any] = None):
+    for level_number, groups in levels:
+        for label, items in groups:
+            record = {"level": level_number}
+            if label is not None:
+                record["parent"] = label_to_json(label) if label_to_json else label
+            for position, value in items:
+                if position is None:
+                    record.pop("index", None)
+                    record.pop("value", None)
+                    record["skipped"] = value
+                else:
+                    record.pop("skipped", None)
+                    record["index"], record["value"] = position, value
+                writer.write(json.dumps(record, default=repr) + "\n")
+
+
+def _dot_node_id(path: tuple) -> str:
+    return "n" + "_".join(map(str, path)) if path else "root"
+
+
+def write_dot_tree(
+        writer: BufferedTextWriter, levels: Iterable[Level], graph_name: str, format_value: Callable[[Any], str] = str
+):
+    writer.write(f"digraph {graph_name} {{\n    node [shape=box];\n    root [shape=point];\n")
+    for _, groups in levels:
+        for label, items in groups:
+            parent = tuple(label) if label is not None else ()
+            parent_id = _dot_node_id(parent)
+            for position, value in items:
+                if position is None:
+                    node_id = parent_id + "_more"
+                    writer.write(f"    {node_id} [label={dot_quote(f'... {value} more')}, shape=plaintext];\n")
+                else:
+                    node_id = _dot_node_id((*parent, position))
+                    writer.write(f"    {node_id} [label={dot_quote(format_value(value))}];\n")
+                writer.write(f"    {parent_id} -> {node_id};\n")
+    writer.write("}\n")
+
+
+def render_tree_levels(
+        levels: Iterable[Level], stream: TextIO, output_format: str, level_header: str, graph_name: str,
+        format_value: Callable[[Any], str] = str
+):
+    check_output_format(output_format)
+    with BufferedTextWriter(stream) as writer:
+        if output_format == "text":
+            write_text_levels(writer, levels, level_header, format_value)
+        elif output_format == "jsonl":
+            write_jsonl_levels(writer, levels, label_to_json=list)
+        else:
+            write_dot_tree(writer, levels, graph_name, format_value)